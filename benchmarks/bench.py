@@ -0,0 +1,298 @@
+"""Benchmarks for the Database and quote-serving hot paths.
+
+Runs fully offline against a throwaway SQLite file per corpus size:
+
+    python -m benchmarks.bench --sizes 1000 100000 --output results.json
+    python -m benchmarks.bench --compare results.json
+
+Corpora are synthetic and seeded, spread evenly over DEFAULT_CATEGORIES,
+so two runs on the same machine measure the same work. The per-category
+cap is lifted to the corpus size so nothing is evicted while measuring.
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import resource
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterator, List, Optional
+
+from config.database import Database
+from config.dedup import fingerprint
+from config.settings import DEFAULT_CATEGORIES
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+SEED = 1234
+SEED_CHUNK = 50_000  # Rows per executemany when seeding a corpus
+BULK_BATCH = 10_000  # Quotes per measured bulk_add_quotes call
+SEED_SQL = """
+INSERT INTO quotes (quote, author, category_id, fingerprint) VALUES (?, ?, ?, ?)
+"""
+WORDS = (
+    "life love time mind heart world change light truth dream fear hope "
+    "courage wisdom success failure journey moment future past silence "
+    "patience kindness strength power freedom peace joy work art nature"
+).split()
+
+
+def make_quotes(
+    count: int, seed: int = SEED, prefix: str = "q"
+) -> Iterator[Dict[str, str]]:
+    """Yield `count` unique synthetic quotes, round-robin over the categories."""
+    rng = random.Random(seed)
+    for i in range(count):
+        words = " ".join(rng.choices(WORDS, k=rng.randint(6, 18)))
+        yield {
+            "quote": f"{words.capitalize()} ({prefix}{i})",
+            "author": f"Author {rng.randrange(5000)}",
+            "category": DEFAULT_CATEGORIES[i % len(DEFAULT_CATEGORIES)],
+        }
+
+
+def seed_corpus(db: Database, size: int, seed: int = SEED):
+    """Load a corpus with plain executemany; seeding is not what is measured."""
+    for category in DEFAULT_CATEGORIES:
+        db.add_category(category)
+    with db.transaction() as conn:
+        category_ids = dict(conn.execute("SELECT name, id FROM categories"))
+        rows = []
+        for item in make_quotes(size, seed):
+            rows.append(
+                (
+                    item["quote"],
+                    item["author"],
+                    category_ids[item["category"]],
+                    fingerprint(item["quote"]),
+                )
+            )
+            if len(rows) == SEED_CHUNK:
+                conn.executemany(SEED_SQL, rows)
+                rows.clear()
+        conn.executemany(SEED_SQL, rows)
+    db.run_maintenance()
+
+
+def summarize(latencies: List[float], items: int = 0) -> Dict[str, float]:
+    """Throughput and latency percentiles (milliseconds) for one operation."""
+    total = sum(latencies)
+    if len(latencies) > 1:
+        cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+        p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+    else:
+        p50 = p95 = p99 = latencies[0]
+    return {
+        "samples": len(latencies),
+        "ops_per_sec": len(latencies) / total if total else 0.0,
+        "items_per_sec": (items or len(latencies)) / total if total else 0.0,
+        "p50_ms": p50 * 1000,
+        "p95_ms": p95 * 1000,
+        "p99_ms": p99 * 1000,
+    }
+
+
+def measure(
+    func: Callable[[int], object],
+    samples: int,
+    items: int = 0,
+    before: Optional[Callable[[], None]] = None,
+) -> Dict[str, float]:
+    """Time `func(i)` for each sample, then once more under tracemalloc.
+
+    `before` runs untimed ahead of every call, e.g. to empty a cache. The
+    tracemalloc pass is separate because tracing slows every allocation.
+    """
+    latencies = []
+    for i in range(samples):
+        if before:
+            before()
+        started = time.perf_counter()
+        func(i)
+        latencies.append(time.perf_counter() - started)
+    result = summarize(latencies, items * samples)
+
+    if before:
+        before()
+    tracemalloc.start()
+    try:
+        func(samples)
+        result["peak_memory_bytes"] = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return result
+
+
+def bench_size(size: int, samples: int, workdir: str) -> Dict:
+    db = Database(db_file=os.path.join(workdir, f"bench-{size}.db"))
+    db.QUOTES_PER_CATEGORY = size
+    operations = {}
+    try:
+        started = time.perf_counter()
+        seed_corpus(db, size)
+        seeded = time.perf_counter() - started
+
+        started = time.perf_counter()
+        db.get_random_quote()  # Builds the in-memory quote index
+        operations["quote_index_load"] = summarize([time.perf_counter() - started])
+
+        new_quotes = make_quotes(samples + 1, seed=SEED + 1, prefix="add")
+        operations["add_quote"] = measure(
+            lambda i: db.add_quote(**next(new_quotes)), samples
+        )
+
+        batches = max(1, min(10, samples // 100))
+        bulk = make_quotes((batches + 1) * BULK_BATCH, seed=SEED + 2, prefix="bulk")
+        operations["bulk_add_quotes"] = measure(
+            lambda i: db.bulk_add_quotes(next(bulk) for _ in range(BULK_BATCH)),
+            batches,
+            items=BULK_BATCH,
+        )
+
+        operations["get_random_quote"] = measure(
+            lambda i: db.get_random_quote(), samples
+        )
+        operations["get_random_quote_category"] = measure(
+            lambda i: db.get_random_quote(
+                DEFAULT_CATEGORIES[i % len(DEFAULT_CATEGORIES)]
+            ),
+            samples,
+        )
+
+        by_category_samples = max(3, samples // 10)
+        operations["get_quotes_by_category"] = measure(
+            lambda i: db.get_quotes_by_category(
+                DEFAULT_CATEGORIES[i % len(DEFAULT_CATEGORIES)]
+            ),
+            by_category_samples,
+            before=db._cache.clear,
+        )
+        operations["get_quotes_by_category_cached"] = measure(
+            lambda i: db.get_quotes_by_category(DEFAULT_CATEGORIES[0]), samples
+        )
+
+        operations["search_quotes"] = measure(
+            lambda i: db.search_quotes(f"q{i * 7919 % size}"), samples
+        )
+
+        # Materialises the whole table, so keep the sample count small
+        operations["get_all_quotes"] = measure(
+            lambda i: db.get_all_quotes(), 3, before=db._cache.clear
+        )
+    finally:
+        db.close()
+
+    return {
+        "size": size,
+        "seed_seconds": seeded,
+        "db_bytes": os.path.getsize(db.db_file),
+        "operations": operations,
+    }
+
+
+def environment() -> Dict[str, str]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "started": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+
+
+def peak_rss_bytes() -> int:
+    # ru_maxrss is kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def quiet_logging(*names: str):
+    """Raise the given loggers to WARNING.
+
+    Per-call info logging would dominate the timings.
+    """
+    for name in names:
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+
+def run(sizes: List[int], samples: int) -> Dict:
+    results = []
+    with tempfile.TemporaryDirectory(prefix="quote-bench-") as workdir:
+        for size in sizes:
+            print(f"Benchmarking {size} quotes...", file=sys.stderr)
+            results.append(bench_size(size, samples, workdir))
+    return {
+        "environment": environment(),
+        "samples": samples,
+        "peak_rss_bytes": peak_rss_bytes(),
+        "results": results,
+    }
+
+
+def print_report(report: Dict, baseline: Optional[Dict] = None):
+    previous = {}
+    if baseline:
+        for result in baseline["results"]:
+            for name, stats in result["operations"].items():
+                previous[(result["size"], name)] = stats
+
+    for result in report["results"]:
+        print(f"\n{result['size']} quotes (seeded in {result['seed_seconds']:.1f}s)")
+        for name, stats in result["operations"].items():
+            line = (
+                f"  {name:32} {stats['items_per_sec']:>12.1f}/s"
+                f"  p50 {stats['p50_ms']:8.3f}ms  p95 {stats['p95_ms']:8.3f}ms"
+                f"  p99 {stats['p99_ms']:8.3f}ms"
+            )
+            old = previous.get((result["size"], name))
+            if old and old["p50_ms"]:
+                line += f"  p50 {stats['p50_ms'] / old['p50_ms'] - 1:+.0%}"
+            print(line)
+    print(f"\nPeak RSS: {report['peak_rss_bytes'] / 2**20:.1f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES),
+        help="corpus sizes to benchmark (up to 10000000)",
+    )
+    parser.add_argument(
+        "--samples", type=int, default=1000, help="timed calls per operation"
+    )
+    parser.add_argument("--output", help="write the JSON results to this file")
+    parser.add_argument("--compare", help="baseline JSON results to compare with")
+    args = parser.parse_args()
+
+    quiet_logging("config")
+
+    report = run(args.sizes, args.samples)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
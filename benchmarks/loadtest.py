@@ -0,0 +1,399 @@
+"""Load test for the Telegram bot's command handlers.
+
+Replays synthetic traffic through the real `Application` handler stack,
+fully offline:
+
+    python -m benchmarks.loadtest --concurrency 1 16 64 --duration 10
+    python -m benchmarks.loadtest --mix quote=8 start=1 search=1 --bot-latency 40
+
+Bot API calls are answered in-process by `FakeBotRequest` after
+`--bot-latency` ms, and API Ninja is a local HTTP stub, so no token or
+network is needed. Each concurrency level runs that many clients, each
+sending one update at a time through `Application.process_update`, which
+is also how the webhook workers feed handlers. The application's own
+limit of concurrent updates applies, so latency above that level
+includes queueing. For each level the report gives throughput, latency
+percentiles per command, event-loop lag and peak RSS.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+from telegram import Update
+from telegram.ext import Application
+from telegram.request import BaseRequest, RequestData
+
+from benchmarks.bench import (
+    SEED,
+    environment,
+    make_quotes,
+    peak_rss_bytes,
+    quiet_logging,
+    seed_corpus,
+    summarize,
+)
+from bots.runtime import Runtime
+from bots.telegram_bot import build_application, prepare_application, stop_application
+from config import settings
+from quotes.breaker import CircuitBreaker
+from quotes.manager import QuoteManager
+
+COMMANDS = {
+    "quote": "/quote",
+    "start": "/start",
+    "list": "/list inspirational",
+    "search": "/search life courage",
+    "category": "/category love",
+    "subscribe": "/subscribe 07:30 UTC",
+}
+DEFAULT_MIX = {"quote": 8, "start": 1, "search": 1}
+DEFAULT_CONCURRENCY = (1, 16, 64)
+LAG_INTERVAL = 0.01  # Seconds between event-loop lag probes
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "Load", "username": "load_bot"}
+
+
+class FakeBotRequest(BaseRequest):
+    """Bot API transport that answers every call in-process.
+
+    Replies are the smallest valid results for the methods the handlers
+    use; everything else returns True. Calls are counted by method.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls: Counter = Counter()
+        self._message_ids = itertools.count(1)
+
+    @property
+    def read_timeout(self) -> Optional[float]:
+        return None
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    async def do_request(
+        self,
+        url: str,
+        method: str,
+        request_data: Optional[RequestData] = None,
+        read_timeout=None,
+        write_timeout=None,
+        connect_timeout=None,
+        pool_timeout=None,
+    ):
+        endpoint = url.rsplit("/", 1)[-1]
+        self.calls[endpoint] += 1
+        # Always yield, as a real request would, even with no latency
+        await asyncio.sleep(self.latency)
+
+        parameters = request_data.parameters if request_data else {}
+        if endpoint == "getMe":
+            result = BOT_USER
+        elif endpoint in ("sendMessage", "editMessageText"):
+            result = {
+                "message_id": next(self._message_ids),
+                "date": int(time.time()),
+                "chat": {"id": parameters.get("chat_id", 0), "type": "private"},
+                "text": parameters.get("text", ""),
+            }
+        else:
+            result = True
+        return 200, json.dumps({"ok": True, "result": result}).encode()
+
+
+class _ApiHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        time.sleep(self.server.latency)
+        body = json.dumps(next(self.server.quotes)).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ApiStub:
+    """Local stand-in for API Ninja, answering each request after `latency` seconds."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}/v1/quotes"
+
+    def start(self):
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _ApiHandler)
+        self._server.daemon_threads = True
+        self._server.latency = self.latency
+        self._server.quotes = (
+            [{"quote": item["quote"], "author": item["author"]}]
+            for item in make_quotes(sys.maxsize, prefix="api")
+        )
+        threading.Thread(
+            target=self._server.serve_forever, name="api-stub", daemon=True
+        ).start()
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+def make_update(update_id: int, chat_id: int, text: str, application) -> Update:
+    command = text.split()[0]
+    data = {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": chat_id, "is_bot": False, "first_name": "Load"},
+            "text": text,
+            "entities": [{"type": "bot_command", "offset": 0, "length": len(command)}],
+        },
+    }
+    return Update.de_json(data, application.bot)
+
+
+async def _probe_lag(lags: List[float]):
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(LAG_INTERVAL)
+        lags.append(time.perf_counter() - started - LAG_INTERVAL)
+
+
+async def drive(
+    application: Application,
+    concurrency: int,
+    duration: float,
+    mix: Dict[str, float],
+    chats: int,
+    rng: random.Random,
+    update_ids: itertools.count,
+) -> Dict:
+    """Run `concurrency` clients for `duration` seconds and summarize them."""
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    latencies: Dict[str, List[float]] = {name: [] for name in names}
+    errors = application.bot_data["loadtest_errors"]
+    errors_before = sum(errors.values())
+    throttle = application.bot_data["throttle"]
+    shed_before = sum(throttle.shed.values())
+    deadline = time.perf_counter() + duration
+
+    async def client():
+        while time.perf_counter() < deadline:
+            name = rng.choices(names, weights)[0]
+            chat_id = rng.randrange(1, chats + 1)
+            update = make_update(next(update_ids), chat_id, COMMANDS[name], application)
+            started = time.perf_counter()
+            await application.process_update(update)
+            latencies[name].append(time.perf_counter() - started)
+
+    lags: List[float] = []
+    prober = asyncio.create_task(_probe_lag(lags))
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    prober.cancel()
+    await asyncio.gather(prober, return_exceptions=True)
+
+    def percentiles(samples: List[float]) -> Dict[str, float]:
+        stats = summarize(samples) if samples else {}
+        return {key: stats.get(key, 0.0) for key in ("p50_ms", "p95_ms", "p99_ms")}
+
+    everything = [latency for samples in latencies.values() for latency in samples]
+    return {
+        "concurrency": concurrency,
+        "requests": len(everything),
+        "errors": sum(errors.values()) - errors_before,
+        # Included in requests: the throttle answers these itself
+        "throttled": sum(throttle.shed.values()) - shed_before,
+        "requests_per_sec": len(everything) / elapsed,
+        "latency": percentiles(everything),
+        "commands": {
+            name: {"requests": len(samples), **percentiles(samples)}
+            for name, samples in latencies.items()
+        },
+        "loop_lag": {
+            **percentiles(lags),
+            "max_ms": max(lags, default=0.0) * 1000,
+        },
+        "peak_rss_bytes": peak_rss_bytes(),
+    }
+
+
+async def run(args: argparse.Namespace) -> Dict:
+    # Handlers only ever see these; the API key just has to be present
+    os.environ.setdefault("API_NINJA_KEY", "loadtest")
+    api = ApiStub(args.api_latency / 1000)
+    api.start()
+    transport = FakeBotRequest(args.bot_latency / 1000)
+    levels = []
+    with tempfile.TemporaryDirectory(prefix="quote-load-") as workdir:
+        # Handlers reach the database through settings (e.g. for categories),
+        # so make the throwaway one the configured database for this process
+        settings.DATABASE_FILE = os.path.join(workdir, "load.db")
+        settings.get_database.cache_clear()
+        seed_corpus(settings.get_database(), args.corpus)
+        runtime = Runtime(
+            metrics_port=0,
+            maintenance=False,
+            manager=QuoteManager(CircuitBreaker("loadtest"), api_url=api.url),
+        )
+        application = build_application("0:loadtest", runtime, request=transport)
+        errors = application.bot_data["loadtest_errors"] = Counter()
+
+        async def count_error(update, context):
+            errors[type(context.error).__name__] += 1
+
+        application.add_error_handler(count_error)
+        await runtime.start()
+        await prepare_application(application)
+        try:
+            rng = random.Random(SEED)
+            update_ids = itertools.count(1)
+            if args.warmup:
+                print(f"Warming up for {args.warmup}s...", file=sys.stderr)
+                await drive(
+                    application, args.concurrency[0], args.warmup,
+                    args.mix, args.chats, rng, update_ids,
+                )
+            for concurrency in args.concurrency:
+                print(f"Driving {concurrency} clients...", file=sys.stderr)
+                if args.trace_memory:
+                    tracemalloc.start()
+                level = await drive(
+                    application, concurrency, args.duration,
+                    args.mix, args.chats, rng, update_ids,
+                )
+                if args.trace_memory:
+                    level["peak_traced_bytes"] = tracemalloc.get_traced_memory()[1]
+                    tracemalloc.stop()
+                levels.append(level)
+        finally:
+            await stop_application(application)
+            await runtime.stop()
+            api.stop()
+
+    return {
+        "environment": environment(),
+        "corpus": args.corpus,
+        "chats": args.chats,
+        "duration": args.duration,
+        "mix": args.mix,
+        "bot_latency_ms": args.bot_latency,
+        "api_latency_ms": args.api_latency,
+        "bot_calls": dict(transport.calls),
+        "errors": dict(errors),
+        "levels": levels,
+    }
+
+
+def print_report(report: Dict):
+    print(
+        f"\n{report['corpus']} quotes, {report['chats']} chats, "
+        f"bot latency {report['bot_latency_ms']}ms, mix {report['mix']}"
+    )
+    for level in report["levels"]:
+        lag = level["loop_lag"]
+        rss = level["peak_rss_bytes"] / 2**20
+        print(
+            f"\n{level['concurrency']:>4} clients"
+            f"  {level['requests_per_sec']:10.1f} req/s  {level['errors']} errors"
+            f"  {level['throttled']} throttled"
+            f"  loop lag p99 {lag['p99_ms']:.2f}ms max {lag['max_ms']:.2f}ms"
+            f"  peak RSS {rss:.1f} MiB"
+        )
+        rows = {"all": level["latency"], **level["commands"]}
+        for name, stats in rows.items():
+            print(
+                f"  {name:12} p50 {stats['p50_ms']:8.3f}ms"
+                f"  p95 {stats['p95_ms']:8.3f}ms  p99 {stats['p99_ms']:8.3f}ms"
+            )
+    if report["errors"]:
+        print(f"\nHandler errors: {report['errors']}")
+
+
+def parse_mix_entry(value: str):
+    name, _, weight = value.partition("=")
+    if name not in COMMANDS:
+        raise argparse.ArgumentTypeError(
+            f"unknown command '{name}' (choose from {', '.join(COMMANDS)})"
+        )
+    try:
+        return name, float(weight or 1)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"bad weight in '{value}'")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--concurrency", type=int, nargs="+", default=list(DEFAULT_CONCURRENCY),
+        help="concurrent clients; one run per value",
+    )
+    parser.add_argument(
+        "--duration", type=float, default=10, help="seconds per concurrency level"
+    )
+    parser.add_argument(
+        "--warmup", type=float, default=2, help="untimed seconds before the first level"
+    )
+    parser.add_argument(
+        "--mix", type=parse_mix_entry, nargs="+",
+        help="traffic mix as command=weight (default: quote=8 start=1 search=1)",
+    )
+    parser.add_argument(
+        "--chats", type=int, default=100_000, help="distinct chats sending updates"
+    )
+    parser.add_argument(
+        "--corpus", type=int, default=10_000, help="quotes in the seeded database"
+    )
+    parser.add_argument(
+        "--bot-latency", type=float, default=0,
+        help="milliseconds the fake Bot API takes per call",
+    )
+    parser.add_argument(
+        "--api-latency", type=float, default=0,
+        help="milliseconds the API Ninja stub takes per request",
+    )
+    parser.add_argument(
+        "--trace-memory", action="store_true",
+        help="also report peak Python allocations (slows every allocation)",
+    )
+    parser.add_argument("--output", help="write the JSON results to this file")
+    args = parser.parse_args()
+    args.mix = dict(args.mix) if args.mix else dict(DEFAULT_MIX)
+
+    quiet_logging("config", "telegram")
+
+    report = asyncio.run(run(args))
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
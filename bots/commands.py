@@ -0,0 +1,13 @@
+from functools import lru_cache
+
+QUOTE_TEMPLATE = "📜 \"{quote}\"\n\n— {author} ✨"
+
+
+@lru_cache(maxsize=256)
+def render_quote(quote: str, author: str, template: str = QUOTE_TEMPLATE) -> str:
+    """Render a message once per (quote, template), however many chats get it."""
+    return template.format(quote=quote, author=author)
+
+
+def format_quote(quote) -> str:
+    return render_quote(quote["quote"], quote["author"])
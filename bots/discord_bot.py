@@ -0,0 +1,73 @@
+import logging
+from datetime import time as day_time
+from typing import Optional
+from zoneinfo import ZoneInfo
+
+import discord
+from discord.ext import commands, tasks
+
+from bots.commands import format_quote
+from bots.runtime import Runtime
+from config.metrics import timed
+from config.settings import (
+    DEFAULT_CATEGORIES,
+    DEFAULT_CATEGORY,
+    DEFAULT_QUOTE_TIME,
+    TIMEZONE,
+)
+from users.preferences import parse_notification_time
+
+logger = logging.getLogger(__name__)
+
+DAILY_QUOTE_TIME = day_time(
+    *parse_notification_time(DEFAULT_QUOTE_TIME), tzinfo=ZoneInfo(TIMEZONE)
+)
+
+
+class QuoteCommands(commands.Cog):
+    def __init__(self, bot: "DiscordQuoteBot"):
+        self.bot = bot
+
+    @commands.command(name="quote")
+    @timed("discord_command_seconds", "Discord command latency", command="quote")
+    async def get_quote(self, ctx: commands.Context, category: str = DEFAULT_CATEGORY):
+        category = category.lower()
+        # Unknown names would each get a pool buffer and API refills
+        if (
+            category not in DEFAULT_CATEGORIES
+            and category not in await self.bot.runtime.db.get_all_categories()
+        ):
+            await ctx.send(f"Unknown category '{category}'.")
+            return
+        quote = await self.bot.runtime.quote_pool.get_quote(category)
+        await ctx.send(format_quote(quote))
+
+    @tasks.loop(time=DAILY_QUOTE_TIME)
+    async def daily_quote(self):
+        channel = self.bot.get_channel(self.bot.channel_id)
+        if channel is None:
+            logger.warning(f"Discord channel {self.bot.channel_id} not found.")
+            return
+        quote = await self.bot.runtime.quote_pool.get_quote()
+        await channel.send(f"Daily Quote:\n{format_quote(quote)}")
+
+    async def cog_load(self):
+        if self.bot.channel_id:
+            self.daily_quote.start()
+
+    async def cog_unload(self):
+        self.daily_quote.cancel()
+
+
+class DiscordQuoteBot(commands.Bot):
+    """Discord front end; quotes come from the runtime's shared pool."""
+
+    def __init__(self, runtime: Runtime, channel_id: Optional[int] = None):
+        intents = discord.Intents.default()
+        intents.message_content = True
+        super().__init__(command_prefix="!", intents=intents)
+        self.runtime = runtime
+        self.channel_id = channel_id
+
+    async def setup_hook(self):
+        await self.add_cog(QuoteCommands(self))
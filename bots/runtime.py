@@ -0,0 +1,138 @@
+import asyncio
+import logging
+import signal
+from typing import Optional
+
+from bots.sharding import Shard
+from config.async_database import AsyncDatabase
+from config.maintenance import MaintenanceTask
+from config.metrics import METRICS_ENABLED, MetricsServer
+from config.settings import METRICS_PORT, SNAPSHOT_FILE, get_database
+from config.snapshot import SnapshotStore
+from config.writer import RemoteWriter
+from quotes.manager import QuoteManager, QuotePool
+
+logger = logging.getLogger(__name__)
+
+
+class Runtime:
+    """Services shared by every bot running in this process.
+
+    One database handle (and with it one read cache and quote index), one
+    prefetched quote pool and one maintenance job, whichever bots are on,
+    plus the metrics endpoint when metrics are enabled.
+
+    A corpus snapshot, once exported, is used only as the pool's fallback
+    while the API cannot fill it, and only while it matches the database's
+    change version; a stale one is skipped for the database. Newly
+    published snapshots are picked up. Rotations, listings and search
+    always read the database.
+
+    A supervisor worker passes the supervisor's `writer` and its own
+    `metrics_port`, and leaves maintenance to the supervisor. `manager`
+    defaults to one calling API Ninja.
+    """
+
+    def __init__(
+        self,
+        writer: Optional[RemoteWriter] = None,
+        metrics_port: int = METRICS_PORT,
+        maintenance: bool = True,
+        manager: Optional[QuoteManager] = None,
+    ):
+        self.db = AsyncDatabase(get_database(), writer=writer)
+        self.snapshot = SnapshotStore(SNAPSHOT_FILE)
+        # Stored quotes back the pool whenever the API cannot
+        self.quote_pool = QuotePool(
+            manager or QuoteManager(), fallback=self._stored_quote
+        )
+        self.maintenance = MaintenanceTask(self.db.db) if maintenance else None
+        self.metrics_server = MetricsServer(metrics_port) if METRICS_ENABLED else None
+
+    async def _stored_quote(self, category: Optional[str] = None):
+        # A snapshot exported before the latest write may hold evicted quotes
+        snapshot = self.snapshot.current
+        if snapshot is not None and (
+            snapshot.change_version == await self.db.change_version()
+        ):
+            quote = snapshot.random_quote(category)
+            if quote is not None:
+                return quote
+        return await self.db.get_random_quote(category)
+
+    async def start(self):
+        if self.metrics_server is not None:
+            self.metrics_server.start()
+        await self.quote_pool.start()
+        if self.maintenance is not None:
+            await self.maintenance.start()
+
+    async def stop(self):
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+        if self.maintenance is not None:
+            await self.maintenance.stop()
+        await self.quote_pool.stop()
+        self.db.close()
+
+
+async def run(
+    telegram_token: Optional[str] = None,
+    discord_token: Optional[str] = None,
+    discord_channel_id: Optional[int] = None,
+    shard: Optional[Shard] = None,
+    writer: Optional[RemoteWriter] = None,
+):
+    """Run the Telegram and/or Discord bot on this event loop until stopped.
+
+    SIGINT/SIGTERM, or either bot failing, shuts everything down in order:
+    bots first, then the shared services. The supervisor's workers pass
+    their `shard` and the supervisor's `writer`.
+    """
+    # Imported here so a process running only one bot needs only its library
+    from bots.discord_bot import DiscordQuoteBot
+    from bots.telegram_bot import (
+        build_application,
+        start_application,
+        stop_application,
+    )
+
+    if shard is None:
+        runtime = Runtime(writer)
+    else:
+        runtime = Runtime(
+            writer, metrics_port=METRICS_PORT + 1 + shard.index, maintenance=False
+        )
+    await runtime.start()
+
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stopping.set)
+        except NotImplementedError:
+            pass  # Windows; Ctrl-C still raises KeyboardInterrupt
+
+    application = discord_bot = None
+    waiters = [asyncio.create_task(stopping.wait())]
+    try:
+        if telegram_token:
+            application = build_application(telegram_token, runtime)
+            await start_application(application, shard=shard)
+        if discord_token:
+            discord_bot = DiscordQuoteBot(runtime, discord_channel_id)
+            waiters.append(asyncio.create_task(discord_bot.start(discord_token)))
+
+        done, _ = await asyncio.wait(waiters, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            task.result()
+    finally:
+        logger.info("Shutting down...")
+        if application is not None:
+            await stop_application(application)
+        if discord_bot is not None:
+            await discord_bot.close()
+        for task in waiters:
+            task.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        await runtime.stop()
@@ -0,0 +1,197 @@
+import asyncio
+import heapq
+import logging
+import time
+from typing import Awaitable, Callable, List, Optional, Set, Tuple
+
+from config.async_database import AsyncDatabase
+from config.settings import DEFAULT_QUOTE_TIME, TIMEZONE
+from users.preferences import PreferencesStore
+
+logger = logging.getLogger(__name__)
+
+MINUTES_PER_DAY = 24 * 60
+MISSED_SLOT_GRACE = 12 * 60  # Minutes a missed slot is still sent after a restart
+RETRY_DELAY = 10  # Seconds before a failed reload or slot claim is retried
+
+Sender = Callable[[List[int]], Awaitable[None]]
+
+
+def current_minute() -> int:
+    """Minutes since the Unix epoch; slots are identified this way."""
+    return int(time.time() // 60)
+
+
+class DailyScheduler:
+    """Sends the daily quote to subscribers grouped by UTC minute of day.
+
+    Chats are bucketed by delivery minute in the `PreferencesStore` and a
+    heap holds the next slot (epoch minute) of every non-empty bucket. Each
+    tick sleeps until the earliest slot, then hands that whole bucket to
+    `sender`. Slots are claimed in the database before sending, so a restart
+    never resends one, and a bucket's last unclaimed slot is caught up on
+    start. Buckets are recomputed once per UTC day to follow DST.
+
+    Under the supervisor each worker schedules only the chats it owns, and
+    claims its slots under its own `shard` number.
+    """
+
+    def __init__(
+        self,
+        db: AsyncDatabase,
+        preferences: PreferencesStore,
+        sender: Sender,
+        shard: int = 0,
+    ):
+        self.db = db
+        self.preferences = preferences
+        self.sender = sender
+        self.shard = shard
+        self._heap: List[Tuple[int, int]] = []
+        self._scheduled: Set[int] = set()
+        self._changed = asyncio.Event()
+        self._day: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._deliveries: Set[asyncio.Task] = set()
+        preferences.add_minute_listener(self._bucket_added)
+
+    async def start(self):
+        await self._load()
+        self._task = asyncio.create_task(self._run(), name="daily-scheduler")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        # Claimed slots are not retried, so let in-flight deliveries finish
+        await asyncio.gather(*self._deliveries, return_exceptions=True)
+
+    def subscribe(
+        self,
+        chat_id: int,
+        notification_time: str = DEFAULT_QUOTE_TIME,
+        timezone: str = TIMEZONE,
+    ) -> int:
+        """Subscribe a chat and return its UTC delivery minute.
+
+        Raises ValueError or KeyError for an invalid time or timezone.
+        """
+        record = self.preferences.update(
+            chat_id,
+            notification_time=notification_time,
+            timezone=timezone,
+            subscribed=True,
+        )
+        return record.delivery_minute
+
+    def unsubscribe(self, chat_id: int) -> bool:
+        if not self.preferences.get(chat_id).subscribed:
+            return False
+        self.preferences.update(chat_id, subscribed=False)
+        return True
+
+    def _bucket_added(self, minute: int):
+        if minute not in self._scheduled:
+            now = current_minute()
+            slot = now - now % MINUTES_PER_DAY + minute
+            self._schedule(minute, slot if slot >= now else slot + MINUTES_PER_DAY)
+
+    def _schedule(self, minute: int, slot: int):
+        heapq.heappush(self._heap, (slot, minute))
+        self._scheduled.add(minute)
+        self._changed.set()
+
+    async def _load(self):
+        # Read first, so a failed read leaves the current schedule in place
+        last_slots = await self.db.get_delivery_slots(self.shard)
+        self.preferences.rebucket()
+        now = current_minute()
+        self._day = now // MINUTES_PER_DAY
+        self._heap.clear()
+        self._scheduled.clear()
+
+        for minute in self.preferences.delivery_minutes():
+            slot = now - now % MINUTES_PER_DAY + minute
+            if slot > now:
+                slot -= MINUTES_PER_DAY
+            missed = (
+                minute in last_slots
+                and last_slots[minute] < slot
+                and now - slot <= MISSED_SLOT_GRACE
+            )
+            self._schedule(minute, slot if missed else slot + MINUTES_PER_DAY)
+
+    async def _run(self):
+        while True:
+            now = time.time()
+            due = bool(self._heap) and self._heap[0][0] * 60 <= now
+            # Due slots go first: at midnight the minute-0 slot is due, but a
+            # reload would already count it as past and move it to tomorrow
+            if not due and int(now // 60) // MINUTES_PER_DAY != self._day:
+                try:
+                    await self._load()
+                except Exception as e:
+                    logger.error(
+                        f"Error reloading the daily schedule: {e!r}; "
+                        f"retrying in {RETRY_DELAY}s"
+                    )
+                    await asyncio.sleep(RETRY_DELAY)
+                continue
+
+            if not due:
+                self._changed.clear()
+                until_tomorrow = (self._day + 1) * MINUTES_PER_DAY * 60 - now
+                if self._heap:
+                    delay = min(self._heap[0][0] * 60 - now, until_tomorrow)
+                else:
+                    delay = until_tomorrow
+                try:
+                    await asyncio.wait_for(self._changed.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            slot, minute = heapq.heappop(self._heap)
+            bucket = self.preferences.chats_at(minute)
+            if not bucket:
+                # Emptied since it was scheduled
+                self._scheduled.discard(minute)
+                continue
+            try:
+                claimed = await self.db.claim_delivery_slot(minute, slot, self.shard)
+            except Exception as e:
+                logger.error(f"Error claiming delivery slot: {e!r}")
+                claimed = None
+            if claimed is None and current_minute() - slot <= MISSED_SLOT_GRACE:
+                # Not recorded either way; try the same slot again shortly
+                logger.warning(
+                    f"Could not claim the {minute // 60:02d}:{minute % 60:02d} UTC "
+                    f"slot; retrying in {RETRY_DELAY}s"
+                )
+                heapq.heappush(self._heap, (slot, minute))
+                await asyncio.sleep(RETRY_DELAY)
+                continue
+            heapq.heappush(self._heap, (slot + MINUTES_PER_DAY, minute))
+            if claimed:
+                self._deliver(list(bucket), minute)
+            elif claimed is None:
+                logger.error(
+                    f"Gave up on the {minute // 60:02d}:{minute % 60:02d} UTC slot "
+                    "after the missed-slot grace period"
+                )
+
+    def _deliver(self, chat_ids: List[int], minute: int):
+        task = asyncio.create_task(self._send(chat_ids, minute))
+        self._deliveries.add(task)
+        task.add_done_callback(self._deliveries.discard)
+
+    async def _send(self, chat_ids: List[int], minute: int):
+        try:
+            await self.sender(chat_ids)
+            logger.info(
+                f"Delivered daily quote to {len(chat_ids)} chats "
+                f"for {minute // 60:02d}:{minute % 60:02d} UTC."
+            )
+        except Exception as e:
+            logger.error(f"Daily quote delivery failed: {e}")
@@ -0,0 +1,70 @@
+import bisect
+import hashlib
+from typing import Any, Dict, List, Optional
+
+from config.settings import WEBHOOK_PORT
+
+VIRTUAL_NODES = 160  # Points per worker on the ring; evens out the split
+
+
+def _point(value: str) -> int:
+    digest = hashlib.blake2b(value.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+class HashRing:
+    """Consistent hashing of integer keys (chat ids) onto `nodes` workers.
+
+    Each worker owns `replicas` pseudo-random points on a 64-bit ring and a
+    key belongs to the first point at or after its hash. Going from N to
+    N+1 workers moves only about 1/(N+1) of the keys.
+    """
+
+    def __init__(self, nodes: int, replicas: int = VIRTUAL_NODES):
+        self.nodes = nodes
+        ring = sorted(
+            (_point(f"worker-{node}-{replica}"), node)
+            for node in range(nodes)
+            for replica in range(replicas)
+        )
+        self._points: List[int] = [point for point, _ in ring]
+        self._owners: List[int] = [node for _, node in ring]
+
+    def owner(self, key: int) -> int:
+        index = bisect.bisect_left(self._points, _point(str(key)))
+        return self._owners[index % len(self._points)]
+
+
+class Shard:
+    """One worker's share of the chats: those the ring maps to `index`."""
+
+    def __init__(self, index: int, count: int):
+        self.index = index
+        self.count = count
+        self.ring = HashRing(count)
+
+    def owns(self, chat_id: int) -> bool:
+        return self.ring.owner(chat_id) == self.index
+
+
+def worker_port(index: int) -> int:
+    """Local port on which worker `index` takes updates from the supervisor."""
+    return WEBHOOK_PORT + 1 + index
+
+
+def update_chat_id(update: Dict[str, Any]) -> Optional[int]:
+    """The chat an Update's JSON belongs to, falling back to the sender.
+
+    Reads the raw payload so routing needs no `telegram.Update` parsing;
+    returns None for updates with neither (e.g. polls).
+    """
+    for key, value in update.items():
+        if key == "update_id" or not isinstance(value, dict):
+            continue
+        chat = value.get("chat") or (value.get("message") or {}).get("chat")
+        if chat and "id" in chat:
+            return chat["id"]
+        sender = value.get("from") or value.get("user")
+        if sender and "id" in sender:
+            return sender["id"]
+    return None
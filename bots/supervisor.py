@@ -0,0 +1,246 @@
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import signal
+import tempfile
+from typing import List, Optional
+from urllib.parse import urlparse
+
+from aiohttp import ClientError, ClientSession, ClientTimeout, web
+from telegram import Bot, Update
+
+from bots.sharding import HashRing, Shard, update_chat_id, worker_port
+from bots.webhook import SECRET_HEADER, UPDATE_WORKERS
+from config.database import Database
+from config.maintenance import MaintenanceTask
+from config.metrics import METRICS_ENABLED, REGISTRY, MetricsServer
+from config.settings import (
+    METRICS_PORT,
+    WEBHOOK_LISTEN,
+    WEBHOOK_PORT,
+    WEBHOOK_SECRET,
+    get_database,
+)
+from config.writer import RemoteWriter, WriterService
+
+logger = logging.getLogger(__name__)
+
+FORWARD_TIMEOUT = 10  # Seconds a worker has to accept a forwarded update
+RESTART_DELAY = 1  # Seconds between checks for crashed workers
+STOP_TIMEOUT = 30  # Seconds a worker has to shut down before it is killed
+MAX_WEBHOOK_CONNECTIONS = 100  # Telegram's upper limit
+
+ROUTED_UPDATES = REGISTRY.counter(
+    "supervisor_updates_total", "Updates routed to workers by outcome"
+)
+
+
+def _run_worker(index: int, count: int, token: str, address: str, authkey: bytes):
+    # Entry point of a spawned worker process
+    from bots.runtime import run
+
+    asyncio.run(
+        run(token, shard=Shard(index, count), writer=RemoteWriter(address, authkey))
+    )
+
+
+class Supervisor:
+    """Runs the Telegram bot as `workers` processes to use more than one core.
+
+    Chats are assigned to workers with consistent hashing (`HashRing`). The
+    supervisor receives the webhook and forwards each update, unparsed, to
+    the worker owning its chat, so a chat's handlers, preferences, rotation
+    and daily delivery always live in one process. A worker's 503 is passed
+    back so Telegram's redelivery still provides backpressure.
+
+    Workers read SQLite directly, but every write goes through the
+    supervisor's `WriterService`, which also runs maintenance. A worker's
+    quote index and read cache pick up those writes through the database's
+    change version (see `Database._check_outside_changes`). Crashed workers
+    are restarted.
+    """
+
+    def __init__(
+        self,
+        token: str,
+        webhook_url: str,
+        workers: int,
+        host: str = WEBHOOK_LISTEN,
+        port: int = WEBHOOK_PORT,
+        secret_token: Optional[str] = WEBHOOK_SECRET,
+    ):
+        self.token = token
+        self.webhook_url = webhook_url
+        self.workers = workers
+        self.host = host
+        self.port = port
+        self.path = urlparse(webhook_url).path or "/"
+        self.secret_token = secret_token
+        self.ring = HashRing(workers)
+        self._context = multiprocessing.get_context("spawn")
+        self._processes: List[multiprocessing.Process] = []
+        self.db: Optional[Database] = None
+        self.writer: Optional[WriterService] = None
+        self.maintenance: Optional[MaintenanceTask] = None
+        self.metrics_server: Optional[MetricsServer] = None
+        self._address = ""
+        self._authkey = os.urandom(32)
+        self._directory: Optional[str] = None
+        self._runner: Optional[web.AppRunner] = None
+        self._session: Optional[ClientSession] = None
+        self._monitor: Optional[asyncio.Task] = None
+
+    async def start(self):
+        # Migrations run here, before any worker opens the database
+        self.db = get_database()
+        self._directory = tempfile.mkdtemp(prefix="quote-bot-")
+        self._address = os.path.join(self._directory, "writer.sock")
+        self.writer = WriterService(self.db, self._address, self._authkey)
+        self.writer.start()
+        self.maintenance = MaintenanceTask(self.db)
+        await self.maintenance.start()
+        self.metrics_server = MetricsServer(METRICS_PORT) if METRICS_ENABLED else None
+        if self.metrics_server is not None:
+            self.metrics_server.start()
+
+        self._processes = [self._spawn(index) for index in range(self.workers)]
+        self._monitor = asyncio.create_task(self._watch(), name="worker-monitor")
+
+        self._session = ClientSession(timeout=ClientTimeout(total=FORWARD_TIMEOUT))
+        app = web.Application()
+        app.router.add_post(self.path, self._receive)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info(
+            f"Routing updates on http://{self.host}:{self.port}{self.path} "
+            f"to {self.workers} workers"
+        )
+
+        async with Bot(self.token) as bot:
+            await bot.set_webhook(
+                self.webhook_url,
+                allowed_updates=Update.ALL_TYPES,
+                secret_token=self.secret_token,
+                max_connections=min(
+                    MAX_WEBHOOK_CONNECTIONS, UPDATE_WORKERS * self.workers
+                ),
+            )
+
+    async def stop(self):
+        """Stop routing, let every worker shut down cleanly, then stop writing."""
+        if self._monitor is not None:
+            self._monitor.cancel()
+            await asyncio.gather(self._monitor, return_exceptions=True)
+            self._monitor = None
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+        for process in self._processes:
+            if process.is_alive():
+                process.terminate()  # SIGTERM: the worker's own orderly shutdown
+        await asyncio.gather(
+            *(asyncio.to_thread(self._reap, process) for process in self._processes)
+        )
+        self._processes = []
+
+        if self.maintenance is not None:
+            await self.maintenance.stop()
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+        if self.writer is not None:
+            self.writer.stop()
+        if self.db is not None:
+            self.db.close()
+        if self._directory is not None:
+            shutil.rmtree(self._directory, ignore_errors=True)
+            self._directory = None
+
+    def _spawn(self, index: int) -> multiprocessing.Process:
+        process = self._context.Process(
+            target=_run_worker,
+            args=(index, self.workers, self.token, self._address, self._authkey),
+            name=f"bot-worker-{index}",
+        )
+        process.start()
+        logger.info(f"Started worker {index} (pid {process.pid})")
+        return process
+
+    @staticmethod
+    def _reap(process: multiprocessing.Process):
+        process.join(STOP_TIMEOUT)
+        if process.is_alive():
+            logger.error(f"{process.name} did not stop in time; killing it")
+            process.kill()
+            process.join()
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(RESTART_DELAY)
+            for index, process in enumerate(self._processes):
+                if not process.is_alive():
+                    logger.error(
+                        f"Worker {index} exited with code {process.exitcode}; "
+                        "restarting it"
+                    )
+                    self._processes[index] = self._spawn(index)
+
+    async def _receive(self, request: web.Request) -> web.Response:
+        secret = request.headers.get(SECRET_HEADER)
+        if self.secret_token and secret != self.secret_token:
+            if METRICS_ENABLED:
+                ROUTED_UPDATES.inc(worker="none", outcome="forbidden")
+            return web.Response(status=403)
+        body = await request.read()
+        try:
+            update = json.loads(body)
+            chat_id = update_chat_id(update)
+            key = chat_id if chat_id is not None else update["update_id"]
+        except (AttributeError, KeyError, TypeError, ValueError) as e:
+            if METRICS_ENABLED:
+                ROUTED_UPDATES.inc(worker="none", outcome="invalid")
+            logger.warning(f"Rejected malformed update: {e}")
+            return web.Response(status=400)
+
+        worker = self.ring.owner(key)
+        headers = {"Content-Type": "application/json"}
+        if self.secret_token:
+            headers[SECRET_HEADER] = self.secret_token
+        url = f"http://127.0.0.1:{worker_port(worker)}{self.path}"
+        try:
+            async with self._session.post(url, data=body, headers=headers) as response:
+                status = response.status
+        except (ClientError, asyncio.TimeoutError):
+            # Worker starting up or restarting; Telegram will redeliver
+            status = 503
+        if METRICS_ENABLED:
+            ROUTED_UPDATES.inc(worker=str(worker), outcome=str(status))
+        if status == 503:
+            return web.Response(status=503, headers={"Retry-After": "1"})
+        return web.Response(status=status)
+
+
+async def supervise(token: str, webhook_url: str, workers: int):
+    """Run a `Supervisor` until SIGINT/SIGTERM."""
+    supervisor = Supervisor(token, webhook_url, workers)
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stopping.set)
+        except NotImplementedError:
+            pass  # Windows; Ctrl-C still raises KeyboardInterrupt
+
+    try:
+        await supervisor.start()
+        await stopping.wait()
+    finally:
+        logger.info("Shutting down workers...")
+        await supervisor.stop()
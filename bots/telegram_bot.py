@@ -0,0 +1,493 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Dict, Iterable, Optional, Tuple
+from urllib.parse import urlparse
+
+from telegram import Bot, InlineKeyboardButton, InlineKeyboardMarkup, Update
+from telegram.error import (
+    BadRequest,
+    Forbidden,
+    NetworkError,
+    RetryAfter,
+    TelegramError,
+)
+from telegram.ext import (
+    Application,
+    CallbackQueryHandler,
+    CommandHandler,
+    ContextTypes,
+)
+from telegram.request import BaseRequest
+
+from bots.commands import format_quote
+from bots.runtime import Runtime
+from bots.scheduler import DailyScheduler
+from bots.sharding import Shard, worker_port
+from bots.throttle import Throttle
+from bots.webhook import UPDATE_WORKERS, WebhookServer
+from config import metrics
+from config.async_database import AsyncDatabase
+from config.metrics import timed
+from config.settings import (
+    ADMIN_USER_IDS,
+    DEFAULT_CATEGORIES,
+    DEFAULT_QUOTE_TIME,
+    TELEGRAM_WEBHOOK_URL,
+    TIMEZONE,
+    WEBHOOK_LISTEN,
+    WEBHOOK_PORT,
+    WEBHOOK_SECRET,
+)
+from quotes.rotation import RotationStore
+from users.preferences import PreferencesStore
+
+logger = logging.getLogger(__name__)
+
+# Telegram allows roughly 30 messages/second overall and 1/second per chat
+GLOBAL_RATE = 25
+PER_CHAT_RATE = 1
+SENDER_WORKERS = 20
+QUEUE_SIZE = 1000
+MAX_RETRIES = 3
+CHAT_LIMITERS = 10000  # Per-chat limiters kept before the least recent is dropped
+MESSAGE_LIMIT = 4096
+
+
+def handler_timed(name: str):
+    return timed(
+        "telegram_handler_seconds", "Telegram command handler latency", handler=name
+    )
+
+
+class TokenBucket:
+    """Asyncio token bucket; `acquire` waits until a token is available.
+
+    Tokens are reserved up front (the balance may go negative), so concurrent
+    callers queue fairly without needing a lock.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+
+    async def acquire(self):
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+        self._tokens -= 1
+        if self._tokens < 0:
+            await asyncio.sleep(-self._tokens / self.rate)
+
+
+def _seconds(value) -> float:
+    # RetryAfter.retry_after is an int today and a timedelta in later releases
+    return value.total_seconds() if isinstance(value, timedelta) else float(value)
+
+
+class Broadcaster:
+    """Fans one message out to many chats within Telegram's flood limits.
+
+    A producer feeds a bounded queue that a pool of sender workers drains.
+    Every send takes a token from the shared global bucket and from the
+    recipient's own bucket. A RetryAfter pauses all workers for the
+    requested time and network errors back off exponentially, up to
+    `max_retries` per chat. Each broadcast returns and logs its counts,
+    throughput and worst queueing lag.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        workers: int = SENDER_WORKERS,
+        queue_size: int = QUEUE_SIZE,
+        global_rate: float = GLOBAL_RATE,
+        per_chat_rate: float = PER_CHAT_RATE,
+        max_retries: int = MAX_RETRIES,
+    ):
+        self.bot = bot
+        self.workers = workers
+        self.queue_size = queue_size
+        self.per_chat_rate = per_chat_rate
+        self.max_retries = max_retries
+        self._global = TokenBucket(global_rate, capacity=global_rate)
+        self._chats: "OrderedDict[int, TokenBucket]" = OrderedDict()
+        self._paused_until = 0.0
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            bucket = self._chats[chat_id] = TokenBucket(self.per_chat_rate)
+            if len(self._chats) > CHAT_LIMITERS:
+                self._chats.popitem(last=False)
+        else:
+            self._chats.move_to_end(chat_id)
+        return bucket
+
+    async def broadcast(self, chat_ids: Iterable[int], text: str) -> Dict[str, float]:
+        queue: "asyncio.Queue[Tuple[int, float]]" = asyncio.Queue(self.queue_size)
+        stats = {"sent": 0, "failed": 0, "retried": 0, "max_lag": 0.0}
+        started = time.monotonic()
+
+        async def worker():
+            while True:
+                chat_id, enqueued = await queue.get()
+                try:
+                    await self._deliver(stats, chat_id, enqueued, text)
+                finally:
+                    queue.task_done()
+
+        workers = [asyncio.create_task(worker()) for _ in range(self.workers)]
+        try:
+            for chat_id in chat_ids:
+                await queue.put((chat_id, time.monotonic()))
+            await queue.join()
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+        elapsed = time.monotonic() - started
+        stats["seconds"] = elapsed
+        stats["per_second"] = stats["sent"] / elapsed if elapsed else 0.0
+        logger.info(
+            f"Broadcast sent {stats['sent']} messages ({stats['failed']} failed, "
+            f"{stats['retried']} retried) in {elapsed:.1f}s, "
+            f"{stats['per_second']:.1f}/s, max lag {stats['max_lag']:.1f}s."
+        )
+        return stats
+
+    async def _deliver(self, stats, chat_id: int, enqueued: float, text: str):
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                stats["retried"] += 1
+            pause = self._paused_until - time.monotonic()
+            if pause > 0:
+                await asyncio.sleep(pause)
+            await self._global.acquire()
+            await self._chat_bucket(chat_id).acquire()
+
+            try:
+                await self.bot.send_message(chat_id, text)
+            except RetryAfter as e:
+                # Flood control applies to the whole bot, so pause every worker
+                self._paused_until = max(
+                    self._paused_until, time.monotonic() + _seconds(e.retry_after)
+                )
+                error = e
+                continue
+            except (Forbidden, BadRequest) as e:
+                # Blocked, left or invalid chat; retrying cannot help
+                stats["failed"] += 1
+                logger.warning(f"Cannot send to chat {chat_id}: {e}")
+                return
+            except NetworkError as e:
+                await asyncio.sleep(2**attempt)
+                error = e
+                continue
+            except TelegramError as e:
+                stats["failed"] += 1
+                logger.warning(f"Failed to send to chat {chat_id}: {e}")
+                return
+
+            stats["sent"] += 1
+            stats["max_lag"] = max(stats["max_lag"], time.monotonic() - enqueued)
+            return
+
+        stats["failed"] += 1
+        logger.warning(f"Giving up on chat {chat_id}: {error}")
+
+
+@handler_timed("start")
+async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await update.message.reply_text(
+        "Welcome to the Daily Quote Bot! 🎯\n\n"
+        "Available commands:\n"
+        "/quote - Get an inspiring quote\n"
+        "/list <category> - Browse the quotes in a category\n"
+        "/search <words> - Find quotes by text or author\n"
+        "/category [name] - Show or change your quote category\n"
+        "/subscribe [HH:MM] [timezone] - Get a quote every day\n"
+        "/unsubscribe - Stop the daily quote\n"
+        "/start - Show this help message"
+    )
+
+
+@handler_timed("get_quote")
+async def get_quote(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    # Stored quotes rotate without repeats; the API pool covers empty categories
+    chat_id = update.effective_chat.id
+    category = context.bot_data["preferences"].get(chat_id).category
+    quote = await context.bot_data["rotations"].next_quote(chat_id, category)
+    if quote is None:
+        quote = await context.bot_data["quote_pool"].get_quote(category)
+    await update.message.reply_text(format_quote(quote))
+
+
+@handler_timed("set_category")
+async def set_category(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    preferences = context.bot_data["preferences"]
+    chat_id = update.effective_chat.id
+    if not context.args:
+        await update.message.reply_text(
+            f"Your category is '{preferences.get(chat_id).category}'. "
+            "Change it with /category <name>."
+        )
+        return
+
+    category = context.args[0].lower()
+    if (
+        category not in DEFAULT_CATEGORIES
+        and category not in await context.bot_data["db"].get_all_categories()
+    ):
+        await update.message.reply_text(f"Unknown category '{category}'.")
+        return
+    preferences.update(chat_id, category=category)
+    await update.message.reply_text(f"Your quotes will now come from '{category}'.")
+
+
+@handler_timed("subscribe")
+async def subscribe(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    notification_time = context.args[0] if context.args else DEFAULT_QUOTE_TIME
+    timezone = context.args[1] if len(context.args) > 1 else TIMEZONE
+    try:
+        context.bot_data["scheduler"].subscribe(
+            update.effective_chat.id, notification_time, timezone
+        )
+    except (ValueError, KeyError):
+        await update.message.reply_text(
+            "Usage: /subscribe [HH:MM] [timezone], e.g. /subscribe 07:30 Europe/London"
+        )
+        return
+    await update.message.reply_text(
+        f"You'll get a quote every day at {notification_time} ({timezone}). ⏰"
+    )
+
+
+@handler_timed("unsubscribe")
+async def unsubscribe(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if context.bot_data["scheduler"].unsubscribe(update.effective_chat.id):
+        await update.message.reply_text("Daily quotes stopped.")
+    else:
+        await update.message.reply_text("You're not subscribed.")
+
+
+async def send_daily_quote(application: Application, chat_ids):
+    # One quote per category, rendered once and shared by its chats
+    preferences = application.bot_data["preferences"]
+    by_category = {}
+    for chat_id in chat_ids:
+        category = preferences.get(chat_id).category
+        by_category.setdefault(category, []).append(chat_id)
+
+    broadcaster = application.bot_data["broadcaster"]
+    quote_pool = application.bot_data["quote_pool"]
+    for category, category_chats in by_category.items():
+        text = format_quote(await quote_pool.get_quote(category))
+        await broadcaster.broadcast(category_chats, text)
+
+
+async def render_quote_page(db: AsyncDatabase, category: str, cursor=None):
+    quotes, next_cursor = await db.get_quotes_page(category, cursor=cursor)
+    if not quotes:
+        return f"No quotes found in '{category}'.", None
+
+    text = f"📚 Quotes in '{category}':\n\n" + "\n\n".join(
+        f"📜 \"{quote.quote}\"\n— {quote.author}" for quote in quotes
+    )
+    markup = None
+    if next_cursor:
+        timestamp, quote_id = next_cursor
+        # Telegram caps callback data at 64 bytes
+        data = f"list {category} {quote_id} {timestamp}"
+        if len(data.encode()) <= 64:
+            markup = InlineKeyboardMarkup(
+                [[InlineKeyboardButton("Next ▶", callback_data=data)]]
+            )
+    return text, markup
+
+
+@handler_timed("list_quotes")
+async def list_quotes(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not context.args:
+        await update.message.reply_text("Usage: /list <category>")
+        return
+
+    category = context.args[0].lower()
+    text, markup = await render_quote_page(context.bot_data["db"], category)
+    await update.message.reply_text(text, reply_markup=markup)
+
+
+@handler_timed("list_quotes_page")
+async def list_quotes_page(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    await query.answer()
+    _, category, quote_id, timestamp = query.data.split(" ", 3)
+    text, markup = await render_quote_page(
+        context.bot_data["db"], category, (timestamp, int(quote_id))
+    )
+    await query.edit_message_text(text, reply_markup=markup)
+
+
+@handler_timed("search")
+async def search(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not context.args:
+        await update.message.reply_text("Usage: /search <words>")
+        return
+
+    query = " ".join(context.args)
+    quotes = await context.bot_data["db"].search_quotes(query)
+    if not quotes:
+        await update.message.reply_text(f"No quotes match '{query}'.")
+        return
+    text = f"🔎 Quotes matching '{query}':\n\n" + "\n\n".join(
+        f"📜 \"{quote.quote}\"\n— {quote.author} ({quote.category})"
+        for quote in quotes
+    )
+    await update.message.reply_text(text[:MESSAGE_LIMIT])
+
+
+@handler_timed("stats")
+async def stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if update.effective_user.id not in ADMIN_USER_IDS:
+        return
+
+    lines = metrics.summary() if metrics.METRICS_ENABLED else [
+        "Metrics are disabled; set METRICS_ENABLED=1 to record them."
+    ]
+    cache = context.bot_data["db"].cache_stats()
+    lines.append(
+        f"Query cache: {cache['size']} entries, {cache['hits']} hits, "
+        f"{cache['misses']} misses, {cache['evictions']} evictions, "
+        f"{cache['collapsed']} loads shared"
+    )
+    throttled = context.bot_data["throttle"].stats()
+    lines.append(
+        f"Throttled: {throttled['by_user']} by user, {throttled['by_chat']} by chat, "
+        f"{throttled['notices']} notices; tracking {throttled['users']} users, "
+        f"{throttled['chats']} chats"
+    )
+    text = "\n".join(lines)
+    if len(text) > MESSAGE_LIMIT:
+        text = text[: MESSAGE_LIMIT - 1] + "…"
+    await update.message.reply_text(text)
+
+
+def build_application(
+    token: str, runtime: Runtime, request: Optional[BaseRequest] = None
+) -> Application:
+    # Polling hands updates to handlers concurrently too, not one at a time
+    builder = Application.builder().token(token).concurrent_updates(UPDATE_WORKERS)
+    if request is not None:
+        # Bot API transport override, e.g. the load test's in-process fake
+        builder = builder.request(request)
+    application = builder.build()
+    application.bot_data["db"] = runtime.db
+    application.bot_data["quote_pool"] = runtime.quote_pool
+
+    commands = {
+        "start": start,
+        "quote": get_quote,
+        "list": list_quotes,
+        "search": search,
+        "category": set_category,
+        "subscribe": subscribe,
+        "unsubscribe": unsubscribe,
+        "stats": stats,
+    }
+    # Runs ahead of the handlers (group -1) on exactly the updates they take,
+    # so group chatter and other bots' commands are never charged
+    throttle = application.bot_data["throttle"] = Throttle()
+    application.add_handler(CommandHandler(list(commands), throttle), group=-1)
+    application.add_handler(
+        CallbackQueryHandler(throttle, pattern=r"^list "), group=-1
+    )
+    for command, callback in commands.items():
+        application.add_handler(CommandHandler(command, callback))
+    application.add_handler(CallbackQueryHandler(list_quotes_page, pattern=r"^list "))
+    return application
+
+
+async def prepare_application(
+    application: Application, shard: Optional[Shard] = None
+):
+    """Start the application and its Telegram-only services.
+
+    Handlers are ready for `application.process_update` afterwards, but no
+    updates are received; `start_application` adds that. As one of the
+    supervisor's workers (`shard` given), the application serves only its
+    own chats and shares the flood limit with the other workers.
+    """
+    await application.initialize()
+    db = application.bot_data["db"]
+    shards = shard.count if shard else 1
+    application.bot_data["broadcaster"] = Broadcaster(
+        application.bot, global_rate=GLOBAL_RATE / shards
+    )
+    preferences = application.bot_data["preferences"] = PreferencesStore(
+        db, owns=shard.owns if shard else None
+    )
+    rotations = application.bot_data["rotations"] = RotationStore(db)
+    scheduler = application.bot_data["scheduler"] = DailyScheduler(
+        db,
+        preferences,
+        lambda chat_ids: send_daily_quote(application, chat_ids),
+        shard=shard.index if shard else 0,
+    )
+    await preferences.start()
+    await rotations.start()
+    await scheduler.start()
+    await application.start()
+
+
+async def start_application(
+    application: Application,
+    webhook_url: Optional[str] = TELEGRAM_WEBHOOK_URL,
+    shard: Optional[Shard] = None,
+):
+    """Start the Telegram-only services, then begin receiving updates.
+
+    Updates arrive through a `WebhookServer` when `webhook_url` is set and
+    by long polling otherwise. A supervisor worker (`shard` given) takes
+    updates forwarded by the supervisor on a local port; the supervisor
+    registers the webhook.
+    """
+    await prepare_application(application, shard)
+
+    if not webhook_url:
+        await application.updater.start_polling(allowed_updates=Update.ALL_TYPES)
+        return
+    webhook = application.bot_data["webhook"] = WebhookServer(
+        application,
+        host="127.0.0.1" if shard else WEBHOOK_LISTEN,
+        port=worker_port(shard.index) if shard else WEBHOOK_PORT,
+        path=urlparse(webhook_url).path or "/",
+        secret_token=WEBHOOK_SECRET,
+    )
+    await webhook.start()
+    if shard is None:
+        await application.bot.set_webhook(
+            webhook_url,
+            allowed_updates=Update.ALL_TYPES,
+            secret_token=WEBHOOK_SECRET,
+            max_connections=webhook.workers,
+        )
+
+
+async def stop_application(application: Application):
+    webhook = application.bot_data.get("webhook")
+    if webhook is not None:
+        await webhook.stop()
+    elif application.updater.running:
+        await application.updater.stop()
+    await application.stop()
+    await application.bot_data["scheduler"].stop()
+    await application.bot_data["rotations"].stop()
+    await application.bot_data["preferences"].stop()
+    await application.shutdown()
@@ -0,0 +1,157 @@
+import logging
+import time
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from telegram import Update
+from telegram.error import TelegramError
+from telegram.ext import ApplicationHandlerStop, ContextTypes
+
+from config.metrics import METRICS_ENABLED, REGISTRY
+from config.settings import ADMIN_USER_IDS
+
+logger = logging.getLogger(__name__)
+
+# Sustained updates per second, and how many may arrive at once
+USER_RATE = 0.5
+USER_BURST = 5
+CHAT_RATE = 1  # Looser: a group chat is shared by its members
+CHAT_BURST = 10
+MAX_BUCKETS = 100_000  # Per limiter, before the least recently used is dropped
+NOTICE_INTERVAL = 30  # Seconds between "slow down" replies to one chat
+THROTTLED_TEXT = "⏳ Too many requests. Please wait a moment and try again."
+
+THROTTLED = REGISTRY.counter(
+    "telegram_throttled_total", "Updates shed by the per-user and per-chat limits"
+)
+
+
+class RateLimiter:
+    """Token buckets for many keys in a compact, bounded table.
+
+    Each key maps to a slot in two float arrays (tokens, last update), so a
+    bucket costs 16 bytes plus its dict entry. Buckets refill lazily when
+    their key is next seen. A bucket untouched for `burst / rate` seconds
+    is full again and no different from a new one, so such idle buckets
+    are dropped as new keys arrive; past `max_entries`, the least recently
+    used bucket goes too.
+    """
+
+    def __init__(self, rate: float, burst: float, max_entries: int = MAX_BUCKETS):
+        self.rate = rate
+        self.burst = burst
+        self.max_entries = max_entries
+        self.idle_after = burst / rate
+        self._slots: "OrderedDict[int, int]" = OrderedDict()
+        self._tokens = array("d")
+        self._updated = array("d")
+        self._free: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def allow(self, key: int, now: Optional[float] = None) -> bool:
+        """Take a token from `key`'s bucket; False if it has none left."""
+        now = time.monotonic() if now is None else now
+        slot = self._slots.get(key)
+        if slot is None:
+            self._evict(now)
+            slot = self._free.pop() if self._free else self._grow()
+            self._slots[key] = slot
+            tokens = self.burst
+        else:
+            self._slots.move_to_end(key)
+            tokens = min(
+                self.burst,
+                self._tokens[slot] + (now - self._updated[slot]) * self.rate,
+            )
+        self._updated[slot] = now
+        if tokens < 1:
+            self._tokens[slot] = tokens
+            return False
+        self._tokens[slot] = tokens - 1
+        return True
+
+    def _grow(self) -> int:
+        self._tokens.append(0.0)
+        self._updated.append(0.0)
+        return len(self._tokens) - 1
+
+    def _evict(self, now: float):
+        # Least recently used first, so the scan stops at the first live bucket
+        while self._slots:
+            key, slot = next(iter(self._slots.items()))
+            idle = now - self._updated[slot] >= self.idle_after
+            if not idle and len(self._slots) < self.max_entries:
+                return
+            del self._slots[key]
+            self._free.append(slot)
+
+
+class Throttle:
+    """Pre-handler that sheds commands from users and chats sending too many.
+
+    Registered in a handler group ahead of the commands, with the same
+    commands and callback patterns, so only updates a handler would take
+    are counted; other messages in a group never use up its budget. A
+    command over its user's or its chat's limit stops there, before any
+    handler can touch the database or the API. The first throttled command
+    in a chat gets a fixed reply, then at most one every `notice_interval`
+    seconds, so shedding costs almost nothing. Admins are never throttled.
+    """
+
+    def __init__(
+        self,
+        user_rate: float = USER_RATE,
+        user_burst: float = USER_BURST,
+        chat_rate: float = CHAT_RATE,
+        chat_burst: float = CHAT_BURST,
+        notice_interval: float = NOTICE_INTERVAL,
+        max_buckets: int = MAX_BUCKETS,
+    ):
+        self.users = RateLimiter(user_rate, user_burst, max_buckets)
+        self.chats = RateLimiter(chat_rate, chat_burst, max_buckets)
+        self._notices = RateLimiter(1 / notice_interval, 1, max_buckets)
+        self.shed = {"user": 0, "chat": 0}
+        self.notices = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "by_user": self.shed["user"],
+            "by_chat": self.shed["chat"],
+            "notices": self.notices,
+            "users": len(self.users),
+            "chats": len(self.chats),
+        }
+
+    async def __call__(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        user = update.effective_user
+        chat = update.effective_chat
+        if user is not None and user.id in ADMIN_USER_IDS:
+            return
+        if user is not None and not self.users.allow(user.id):
+            scope = "user"
+        elif chat is not None and not self.chats.allow(chat.id):
+            scope = "chat"
+        else:
+            return
+
+        self.shed[scope] += 1
+        if METRICS_ENABLED:
+            THROTTLED.inc(scope=scope)
+        key = chat.id if chat is not None else user.id
+        if self._notices.allow(key):
+            self.notices += 1
+            await self._notify(update)
+        raise ApplicationHandlerStop
+
+    @staticmethod
+    async def _notify(update: Update):
+        try:
+            if update.callback_query is not None:
+                await update.callback_query.answer(THROTTLED_TEXT)
+            elif update.effective_message is not None:
+                await update.effective_message.reply_text(THROTTLED_TEXT)
+        except TelegramError as e:
+            logger.warning(f"Could not send throttle notice: {e}")
@@ -0,0 +1,141 @@
+import asyncio
+import json
+import logging
+from typing import Dict, List, Optional
+
+from aiohttp import web  # Installed with discord.py
+from telegram import Update
+from telegram.ext import Application
+
+from config.metrics import METRICS_ENABLED, REGISTRY
+
+logger = logging.getLogger(__name__)
+
+UPDATE_WORKERS = 16  # Updates processed at once
+UPDATE_QUEUE_SIZE = 256  # Accepted updates waiting for a worker
+ENQUEUE_TIMEOUT = 2  # Seconds a delivery waits for queue space before a 503
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+WEBHOOK_UPDATES = REGISTRY.counter(
+    "telegram_webhook_updates_total", "Webhook deliveries by outcome"
+)
+
+
+class WebhookServer:
+    """Receives Telegram updates over HTTP and processes them concurrently.
+
+    Each POST to `path` is parsed into an `Update` and queued; `workers`
+    tasks take updates off the queue and run them through the application's
+    handlers, so one slow handler only holds up its own worker. At most
+    `workers + queue_size` updates are in flight. When the queue is full a
+    delivery waits up to `enqueue_timeout` seconds for space, which slows
+    Telegram down, and is then refused with 503 so Telegram redelivers it
+    later.
+
+    Nothing here calls the Bot API, so the server can be exercised offline
+    by posting Update JSON to it; `start_application` registers the public
+    URL with Telegram.
+    """
+
+    def __init__(
+        self,
+        application: Application,
+        host: str = "127.0.0.1",
+        port: int = 8443,
+        path: str = "/telegram",
+        secret_token: Optional[str] = None,
+        workers: int = UPDATE_WORKERS,
+        queue_size: int = UPDATE_QUEUE_SIZE,
+        enqueue_timeout: float = ENQUEUE_TIMEOUT,
+    ):
+        self.application = application
+        self.host = host
+        self.port = port
+        self.path = path
+        self.secret_token = secret_token
+        self.workers = workers
+        self.queue_size = queue_size
+        self.enqueue_timeout = enqueue_timeout
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._runner: Optional[web.AppRunner] = None
+        self._in_flight = 0
+
+    async def start(self):
+        self._queue = asyncio.Queue(self.queue_size)
+        self._tasks = [
+            asyncio.create_task(self._work(), name=f"webhook-worker-{i}")
+            for i in range(self.workers)
+        ]
+        app = web.Application()
+        app.router.add_post(self.path, self._receive)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+        logger.info(f"Receiving updates on http://{self.host}:{self.port}{self.path}")
+
+    async def stop(self):
+        """Stop accepting updates, finish the queued ones, then stop the workers."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+        if self._queue is not None:
+            await self._queue.join()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": self._queue.qsize() if self._queue else 0,
+            "in_flight": self._in_flight,
+        }
+
+    async def _receive(self, request: web.Request) -> web.Response:
+        secret = request.headers.get(SECRET_HEADER)
+        if self.secret_token and secret != self.secret_token:
+            if METRICS_ENABLED:
+                WEBHOOK_UPDATES.inc(outcome="forbidden")
+            return web.Response(status=403)
+        try:
+            data = await request.json()
+            # de_json turns null into None and chokes on other non-objects
+            if not isinstance(data, dict) or not isinstance(data.get("update_id"), int):
+                raise ValueError("not an Update object")
+            update = Update.de_json(data, self.application.bot)
+        except (
+            AttributeError,
+            json.JSONDecodeError,
+            KeyError,
+            TypeError,
+            ValueError,
+        ) as e:
+            if METRICS_ENABLED:
+                WEBHOOK_UPDATES.inc(outcome="invalid")
+            logger.warning(f"Rejected malformed update: {e}")
+            return web.Response(status=400)
+
+        try:
+            await asyncio.wait_for(self._queue.put(update), self.enqueue_timeout)
+        except asyncio.TimeoutError:
+            if METRICS_ENABLED:
+                WEBHOOK_UPDATES.inc(outcome="shed")
+            return web.Response(status=503, headers={"Retry-After": "1"})
+        if METRICS_ENABLED:
+            WEBHOOK_UPDATES.inc(outcome="accepted")
+        return web.Response()
+
+    async def _work(self):
+        while True:
+            update = await self._queue.get()
+            self._in_flight += 1
+            try:
+                await self.application.process_update(update)
+            except Exception as e:
+                logger.error(f"Error processing update {update.update_id}: {e}")
+            finally:
+                self._in_flight -= 1
+                self._queue.task_done()
@@ -0,0 +1,214 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .database import (
+    BULK_CHUNK_SIZE,
+    PAGE_SIZE,
+    SEARCH_LIMIT,
+    VACUUM_PAGES,
+    Database,
+    PageCursor,
+    QuoteRow,
+)
+from .writer import RemoteWriter
+
+QUERY_TIMEOUT = 10  # Seconds before an awaited query is interrupted
+READER_THREADS = 4
+
+
+class _Query:
+    """A database call running on an executor thread that can be interrupted."""
+
+    def __init__(self, db: Database, func: Callable, args: tuple, kwargs: dict):
+        self.db = db
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self._conn = None
+        self._cancelled = False
+        self._lock = threading.Lock()
+
+    def run(self):
+        # Held for the whole call, so `func` runs on the connection we interrupt
+        with self.db.connection() as conn:
+            with self._lock:
+                if self._cancelled:
+                    return None
+                self._conn = conn
+            try:
+                return self.func(*self.args, **self.kwargs)
+            finally:
+                with self._lock:
+                    self._conn = None
+
+    def cancel(self):
+        with self._lock:
+            self._cancelled = True
+            if self._conn is not None:
+                # Aborts the statement currently running on this thread's
+                # connection; the Database method logs it and rolls back.
+                self._conn.interrupt()
+
+
+class AsyncDatabase:
+    """Awaitable counterpart of `Database` for use from bot handlers.
+
+    Writes are serialized on a single writer thread so they never fight over
+    SQLite's write lock; reads run on a bounded pool of reader threads. Each
+    thread keeps its own persistent connection. Awaits that time out or are
+    cancelled interrupt the underlying query.
+
+    With a `RemoteWriter`, writes are sent to another process's
+    `WriterService` instead, so several worker processes share one writer.
+    """
+
+    def __init__(
+        self,
+        db: Optional[Database] = None,
+        readers: int = READER_THREADS,
+        timeout: Optional[float] = QUERY_TIMEOUT,
+        writer: Optional[RemoteWriter] = None,
+    ):
+        self.db = db or Database()
+        self.timeout = timeout
+        self.writer = writer
+        self._writer = ThreadPoolExecutor(1, thread_name_prefix="db-writer")
+        self._readers = ThreadPoolExecutor(readers, thread_name_prefix="db-reader")
+
+    async def run(
+        self,
+        func: Callable,
+        *args: Any,
+        write: bool = False,
+        timeout: Optional[float] = QUERY_TIMEOUT,
+        **kwargs: Any,
+    ) -> Any:
+        """Run `func(*args, **kwargs)` on the writer or a reader thread."""
+        if write and self.writer is not None:
+            # `func` is a Database method; run the writer process's own copy
+            func = functools.partial(self.writer.call, func.__name__)
+            args, kwargs = (args, kwargs), {}
+        query = _Query(self.db, func, args, kwargs)
+        executor = self._writer if write else self._readers
+        future = asyncio.get_running_loop().run_in_executor(executor, query.run)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            query.cancel()
+            raise
+
+    async def _read(self, func: Callable, *args: Any, **kwargs: Any) -> Any:
+        return await self.run(func, *args, timeout=self.timeout, **kwargs)
+
+    async def _write(self, func: Callable, *args: Any, **kwargs: Any) -> Any:
+        return await self.run(func, *args, write=True, timeout=self.timeout, **kwargs)
+
+    def cache_stats(self) -> Dict[str, int]:
+        return self.db.cache_stats()
+
+    def close(self):
+        self._writer.shutdown(wait=True)
+        self._readers.shutdown(wait=True)
+        if self.writer is not None:
+            self.writer.close()
+        self.db.close()
+
+    async def create_tables(self):
+        return await self._write(self.db.create_tables)
+
+    async def run_maintenance(self, vacuum_pages: int = VACUUM_PAGES):
+        return await self.run(
+            self.db.run_maintenance, vacuum_pages, write=True, timeout=None
+        )
+
+    async def get_all_categories(self) -> List[str]:
+        return await self._read(self.db.get_all_categories)
+
+    async def count_quotes_in_category(self, category_id: int) -> int:
+        return await self._read(self.db.count_quotes_in_category, category_id)
+
+    async def remove_oldest_quote_from_category(self, category_id: int):
+        return await self._write(
+            self.db.remove_oldest_quote_from_category, category_id
+        )
+
+    async def add_category(self, category_name: str) -> bool:
+        return await self._write(self.db.add_category, category_name)
+
+    async def add_quote(self, quote: str, author: str, category: str) -> bool:
+        return await self._write(self.db.add_quote, quote, author, category)
+
+    async def bulk_add_quotes(
+        self, quotes: Iterable[Dict], chunk_size: int = BULK_CHUNK_SIZE
+    ) -> List[Dict[str, int]]:
+        return await self.run(
+            self.db.bulk_add_quotes, quotes, chunk_size, write=True, timeout=None
+        )
+
+    async def get_all_quotes(self) -> List[Dict]:
+        return await self._read(self.db.get_all_quotes)
+
+    async def get_random_quote(
+        self,
+        category: Optional[str] = None,
+        weights: Optional[Dict[str, float]] = None,
+    ) -> Optional[Dict]:
+        return await self._read(self.db.get_random_quote, category, weights)
+
+    async def quote_count(self, category: Optional[str] = None) -> int:
+        return await self._read(self.db.quote_count, category)
+
+    async def change_version(self) -> Optional[int]:
+        return await self._read(self.db.change_version)
+
+    async def quote_set(self, category: str) -> Tuple[int, int]:
+        return await self._read(self.db.quote_set, category)
+
+    async def get_quote_at(self, category: str, position: int) -> Optional[Dict]:
+        return await self._read(self.db.get_quote_at, category, position)
+
+    async def get_quotes_by_category(self, category: str) -> List[Dict]:
+        return await self._read(self.db.get_quotes_by_category, category)
+
+    async def get_quotes_page(
+        self,
+        category: str,
+        limit: int = PAGE_SIZE,
+        cursor: Optional[PageCursor] = None,
+    ) -> Tuple[List[QuoteRow], Optional[PageCursor]]:
+        return await self._read(self.db.get_quotes_page, category, limit, cursor)
+
+    async def search_quotes(
+        self, query: str, category: Optional[str] = None, limit: int = SEARCH_LIMIT
+    ) -> List[QuoteRow]:
+        return await self._read(self.db.search_quotes, query, category, limit)
+
+    async def initialize_default_data(self, categories: Optional[List[str]] = None):
+        return await self._write(self.db.initialize_default_data, categories)
+
+    async def get_user_preferences(self) -> List[Tuple[int, str, str, str, int, int]]:
+        return await self._read(self.db.get_user_preferences)
+
+    async def save_user_preferences(self, rows: Iterable[tuple]) -> bool:
+        return await self._write(self.db.save_user_preferences, rows)
+
+    async def get_quote_rotation(
+        self, chat_id: int, category: str
+    ) -> Optional[Tuple[int, int, int, int]]:
+        return await self._read(self.db.get_quote_rotation, chat_id, category)
+
+    async def save_quote_rotations(self, rows: Iterable[tuple]) -> bool:
+        return await self._write(self.db.save_quote_rotations, rows)
+
+    async def get_delivery_slots(self, shard: int = 0) -> Dict[int, int]:
+        return await self._read(self.db.get_delivery_slots, shard)
+
+    async def claim_delivery_slot(
+        self, delivery_minute: int, slot: int, shard: int = 0
+    ) -> Optional[bool]:
+        return await self._write(
+            self.db.claim_delivery_slot, delivery_minute, slot, shard
+        )
@@ -1,25 +1,291 @@
 import sqlite3
-from typing import List, Dict, Optional
+from contextlib import contextmanager
+from itertools import islice
+from typing import (
+    Callable,
+    Iterable,
+    Iterator,
+    List,
+    Dict,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
 import os
 import logging
+import re
+import threading
+import time
+
+from .cache import QueryCache
+from .dedup import NearDuplicateIndex, fingerprint
+from .metrics import instrument_methods
+from .migrations import migrate
+from .quote_index import QuoteIndex
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Applied to every new connection. WAL lets readers run alongside the writer
+# and NORMAL sync is durable across application crashes in WAL mode.
+# auto_vacuum only takes effect on a new file, so it has to come first.
+CONNECTION_PRAGMAS = (
+    "PRAGMA auto_vacuum=INCREMENTAL",
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-8000",
+    "PRAGMA mmap_size=67108864",
+)
+STATEMENT_CACHE_SIZE = 256
+BUSY_TIMEOUT = 30
+RANDOM_PICK_ATTEMPTS = 3
+BULK_CHUNK_SIZE = 500  # Stays below SQLite's bound-parameter limit
+VACUUM_PAGES = 1000  # Free pages released per maintenance run
+CACHE_SIZE = 256  # Cached read results kept in memory
+CACHE_TTL = 60  # Seconds before a cached read is re-fetched
+STREAM_CHUNK_SIZE = 1000  # Rows fetched per round trip when streaming
+PAGE_SIZE = 5
+SEARCH_LIMIT = 10
+CHANGE_CHECK_INTERVAL = 1  # Seconds between checks for other processes' writes
+
+# Read-cache keys; per-category listings use ("quotes_by_category", name).
+# Cached lists are copied on return, but the row dicts inside are shared.
+CATEGORIES_KEY = ("categories",)
+ALL_QUOTES_KEY = ("all_quotes",)
+
+# Bumped by triggers on every quote and category change (migration 9)
+CHANGE_VERSION_SQL = "SELECT version FROM quote_changes"
+
+
+class QuoteRow(NamedTuple):
+    id: int
+    quote: str
+    author: str
+    category: str
+    timestamp: str
+
+
+# Keyset pagination cursor: (timestamp, id) of the last row on a page
+PageCursor = Tuple[str, int]
 
+PREFERENCE_COLUMNS = (
+    "chat_id",
+    "category",
+    "notification_time",
+    "timezone",
+    "delivery_minute",
+    "subscribed",
+)
+
+
+@instrument_methods(
+    "quote_db_method_seconds",
+    "Latency of Database methods",
+    # Per-call plumbing, or return before doing their work
+    exclude=(
+        "connect",
+        "connection",
+        "transaction",
+        "close",
+        "cache_stats",
+        "iter_all_quotes",
+        "iter_quotes_by_category",
+    ),
+)
 class Database:
-    def __init__(self, db_file: str = os.getenv("DATABASE_FILE", "quotes.db")):
+    def __init__(
+        self,
+        db_file: str = os.getenv("DATABASE_FILE", "quotes.db"),
+        persistent: bool = True,
+        near_duplicate_threshold: Optional[float] = None,
+    ):
         self.db_file = db_file
+        self.persistent = persistent  # Keep one connection per thread open
         self.QUOTES_PER_CATEGORY = 10  # Maximum number of quotes per category
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._quote_index = QuoteIndex()
+        # Optional: also reject quotes this similar to a stored one
+        self._near_duplicates = (
+            NearDuplicateIndex(near_duplicate_threshold)
+            if near_duplicate_threshold
+            else None
+        )
+        self._cache = QueryCache(CACHE_SIZE, CACHE_TTL)
+        # Change version our in-memory state reflects; None until first read
+        self._seen_version: Optional[int] = None
+        self._version_checked = 0.0
+        self._version_lock = threading.Lock()
         self.create_tables()
+        self._check_outside_changes()  # Start from the current version
+
+    def _open_connection(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_file,
+            timeout=BUSY_TIMEOUT,
+            cached_statements=STATEMENT_CACHE_SIZE,
+            check_same_thread=False,
+        )
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        return conn
 
-    def connect(self):
+    def connect(self) -> sqlite3.Connection:
+        """Return the calling thread's connection, opening it on first use.
+
+        With ``persistent=False`` every call outside a `connection` block
+        opens a fresh connection, which the caller must close.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            return conn
         try:
-            return sqlite3.connect(self.db_file)
+            conn = self._open_connection()
         except sqlite3.Error as e:
             logger.error(f"Error connecting to database: {e}")
-            return None
+            raise
+        if self.persistent:
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Hold the calling thread's connection for the duration of a block.
+
+        With ``persistent=False`` the connection is opened here, shared by
+        every `connect` and `transaction` inside the block and closed on exit.
+        """
+        conn = self.connect()
+        if conn is getattr(self._local, "conn", None):
+            yield conn
+            return
+        self._local.conn = conn
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            conn.close()
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Run a block in a transaction, committing on success.
+
+        Nested calls on the same thread join the outer transaction instead of
+        opening another connection, so helpers like
+        `count_quotes_in_category` see and share the caller's writes.
+        """
+        conn = getattr(self._local, "transaction_conn", None)
+        if conn is not None:
+            yield conn
+            return
+
+        with self.connection() as conn:
+            self._local.transaction_conn = conn
+            self._local.after_commit = []
+            self._local.version_before = None
+            try:
+                with conn:
+                    yield conn
+                    before = self._local.version_before
+                    if before is not None:
+                        after = conn.execute(CHANGE_VERSION_SQL).fetchone()[0]
+                        self._after_commit(lambda: self._own_changes(before, after))
+                callbacks = self._local.after_commit
+            finally:
+                self._local.transaction_conn = None
+                self._local.after_commit = []
+                self._local.version_before = None
+        for callback in callbacks:
+            callback()
+
+    def _after_commit(self, callback: Callable[[], None]):
+        """Run `callback` once the current transaction commits.
+
+        In-memory state derived from the tables is updated this way so a
+        rolled-back transaction leaves it untouched.
+        """
+        if getattr(self._local, "transaction_conn", None) is None:
+            callback()
+        else:
+            self._local.after_commit.append(callback)
+
+    def _track_changes(self, conn: sqlite3.Connection):
+        """Mark the current transaction's quote and category writes as our own.
+
+        Call before the transaction's first write to either table. It takes
+        the write lock at once, so no other process can commit between the
+        version read here and the one read just before our commit.
+        """
+        if self._local.version_before is not None:
+            return
+        if not conn.in_transaction:
+            conn.execute("BEGIN IMMEDIATE")
+        self._local.version_before = conn.execute(CHANGE_VERSION_SQL).fetchone()[0]
+
+    def _own_changes(self, before: int, after: int):
+        # Our after-commit callbacks already applied these changes precisely
+        with self._version_lock:
+            if self._seen_version == before:
+                self._seen_version = after
+
+    def _check_outside_changes(self):
+        """Drop in-memory state if another process or instance has written.
+
+        The index, read cache and near-duplicate index only follow this
+        instance's own writes, so every read served from them first compares
+        the triggers' change version with the one they reflect, at most once
+        every `CHANGE_CHECK_INTERVAL` seconds.
+        """
+        now = time.monotonic()
+        if now - self._version_checked < CHANGE_CHECK_INTERVAL:
+            return
+        self._version_checked = now
+        try:
+            with self.transaction() as conn:
+                version = conn.execute(CHANGE_VERSION_SQL).fetchone()[0]
+        except sqlite3.Error as e:
+            logger.error(f"Error checking for changes: {e}")
+            return
+        with self._version_lock:
+            seen, self._seen_version = self._seen_version, version
+        if seen is None or seen == version:
+            return
+        logger.info("Quotes changed outside this instance; reloading them.")
+        self._quote_index.invalidate()
+        if self._near_duplicates is not None:
+            self._near_duplicates.invalidate()
+        self._cache.clear()
+
+    def change_version(self) -> Optional[int]:
+        """Version of the quotes and categories tables, at most a second old."""
+        self._check_outside_changes()
+        return self._seen_version
+
+    def _categories_changed(self):
+        self._cache.invalidate(CATEGORIES_KEY)
+
+    def _quotes_changed(self, *categories: str):
+        self._cache.invalidate(
+            ALL_QUOTES_KEY,
+            *(("quotes_by_category", category) for category in categories),
+        )
+
+    def cache_stats(self) -> Dict[str, int]:
+        """Size and hit/miss/eviction counters of the read cache."""
+        return self._cache.stats()
+
+    def close(self):
+        """Close every persistent connection opened by this instance."""
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
 
     def create_tables(self):
         sql_create_categories = """
@@ -39,19 +305,57 @@ class Database:
         );"""
 
         try:
-            with self.connect() as conn:
-                c = conn.cursor()
-                c.execute(sql_create_categories)
-                c.execute(sql_create_quotes)
-                conn.commit()
-                logger.info("Tables created successfully.")
+            with self.connection() as conn:
+                with self.transaction():
+                    c = conn.cursor()
+                    c.execute(sql_create_categories)
+                    c.execute(sql_create_quotes)
+                    logger.info("Tables created successfully.")
+                migrate(conn)
         except sqlite3.Error as e:
             logger.error(f"Error creating tables: {e}")
 
+    def run_maintenance(self, vacuum_pages: int = VACUUM_PAGES):
+        """Refresh planner statistics, release free pages and checkpoint the WAL.
+
+        Incremental vacuum is a no-op on files created before auto_vacuum was
+        enabled; a one-off VACUUM converts them.
+        """
+        try:
+            with self.connection() as conn:
+                with self.transaction():
+                    conn.execute("ANALYZE")
+                    conn.execute(
+                        f"PRAGMA incremental_vacuum({int(vacuum_pages)})"
+                    ).fetchall()
+                busy, _, _ = conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+            if busy:
+                logger.warning("WAL checkpoint skipped: database is busy.")
+            logger.info("Database maintenance completed.")
+        except sqlite3.Error as e:
+            logger.error(f"Error running maintenance: {e}")
+
+    def get_all_categories(self) -> List[str]:
+        """Fetch all category names from the database."""
+        sql = "SELECT name FROM categories ORDER BY name"
+
+        def load():
+            with self.transaction() as conn:
+                c = conn.cursor()
+                c.execute(sql)
+                return [row[0] for row in c.fetchall()]
+
+        try:
+            self._check_outside_changes()
+            return list(self._cache.get(CATEGORIES_KEY, load))
+        except sqlite3.Error as e:
+            logger.error(f"Error fetching categories: {e}")
+            return []
+
     def count_quotes_in_category(self, category_id: int) -> int:
         sql = "SELECT COUNT(*) FROM quotes WHERE category_id = ?"
         try:
-            with self.connect() as conn:
+            with self.transaction() as conn:
                 c = conn.cursor()
                 c.execute(sql, (category_id,))
                 return c.fetchone()[0]
@@ -61,32 +365,45 @@ class Database:
 
     def remove_oldest_quote_from_category(self, category_id: int):
         sql = """
-        DELETE FROM quotes 
-        WHERE id IN (
-            SELECT id FROM quotes 
-            WHERE category_id = ? 
-            ORDER BY timestamp ASC 
-            LIMIT 1
-        )"""
-        try:
-            with self.connect() as conn:
+        SELECT q.id, c.name
+        FROM quotes q
+        JOIN categories c ON q.category_id = c.id
+        WHERE q.category_id = ?
+        ORDER BY q.timestamp ASC, q.id ASC
+        LIMIT 1
+        """
+        try:
+            with self.transaction() as conn:
+                self._track_changes(conn)
                 c = conn.cursor()
                 c.execute(sql, (category_id,))
-                conn.commit()
-                logger.info(f"Oldest quote removed from category ID {category_id}.")
+                row = c.fetchone()
+                if not row:
+                    return
+                quote_id, category = row
+                c.execute("DELETE FROM quotes WHERE id = ?", (quote_id,))
+                self._after_commit(
+                    lambda: self._quote_index.remove(category, quote_id)
+                )
+                if self._near_duplicates is not None:
+                    self._after_commit(lambda: self._near_duplicates.remove(quote_id))
+                self._after_commit(lambda: self._quotes_changed(category))
+                logger.debug(f"Oldest quote removed from category ID {category_id}.")
         except sqlite3.Error as e:
             logger.error(f"Error removing oldest quote from category: {e}")
 
     def add_category(self, category_name: str) -> bool:
         try:
-            with self.connect() as conn:
+            with self.transaction() as conn:
+                self._track_changes(conn)
                 c = conn.cursor()
                 c.execute(
                     "INSERT OR IGNORE INTO categories (name) VALUES (?)",
                     (category_name,),
                 )
-                conn.commit()
-                logger.info(f"Category '{category_name}' added successfully.")
+                if c.rowcount:
+                    self._after_commit(self._categories_changed)
+                logger.debug(f"Category '{category_name}' added successfully.")
                 return True
         except sqlite3.Error as e:
             logger.error(f"Error adding category: {e}")
@@ -94,19 +411,32 @@ class Database:
 
     def add_quote(self, quote: str, author: str, category: str) -> bool:
         try:
-            with self.connect() as conn:
+            with self.transaction() as conn:
+                self._track_changes(conn)
                 c = conn.cursor()
 
-                # Check if quote already exists
-                c.execute("SELECT 1 FROM quotes WHERE quote = ?", (quote,))
+                # Check if quote already exists, ignoring case and punctuation
+                value = fingerprint(quote)
+                c.execute("SELECT 1 FROM quotes WHERE fingerprint = ?", (value,))
                 if c.fetchone():
                     logger.warning("Quote already exists.")
                     return False
 
+                signature = None
+                if self._near_duplicates is not None:
+                    self._near_duplicates.ensure_loaded(self._load_near_duplicates)
+                    signature = self._near_duplicates.signature(quote)
+                    match = self._near_duplicates.find(quote, signature)
+                    if match is not None:
+                        logger.warning(f"Quote is a near duplicate of quote {match}.")
+                        return False
+
                 # Get category id or create new category
                 c.execute(
                     "INSERT OR IGNORE INTO categories (name) VALUES (?)", (category,)
                 )
+                if c.rowcount:
+                    self._after_commit(self._categories_changed)
                 c.execute("SELECT id FROM categories WHERE name = ?", (category,))
                 category_id = c.fetchone()[0]
 
@@ -118,15 +448,190 @@ class Database:
                     self.remove_oldest_quote_from_category(category_id)
 
                 # Add the new quote
-                sql = "INSERT INTO quotes (quote, author, category_id) VALUES (?, ?, ?)"
-                c.execute(sql, (quote, author, category_id))
-                conn.commit()
-                logger.info(f"Quote added to category '{category}'.")
+                sql = """
+                INSERT INTO quotes (quote, author, category_id, fingerprint)
+                VALUES (?, ?, ?, ?)"""
+                c.execute(sql, (quote, author, category_id, value))
+                quote_id = c.lastrowid
+                self._after_commit(lambda: self._quote_index.add(category, quote_id))
+                if signature is not None:
+                    self._after_commit(
+                        lambda: self._near_duplicates.add(quote_id, quote, signature)
+                    )
+                self._after_commit(lambda: self._quotes_changed(category))
+                logger.debug(f"Quote added to category '{category}'.")
                 return True
         except sqlite3.Error as e:
             logger.error(f"Error adding quote: {e}")
             return False
 
+    def bulk_add_quotes(
+        self, quotes: Iterable[Dict], chunk_size: int = BULK_CHUNK_SIZE
+    ) -> List[Dict[str, int]]:
+        """Insert many quotes in a single transaction.
+
+        Each item needs "quote", "author" and "category" keys. The iterable is
+        consumed in chunks of `chunk_size`, and one dict of "inserted",
+        "duplicates" and "evicted" counts is returned per chunk. Duplicates
+        are matched the same way as in `add_quote`, against stored quotes and
+        earlier items alike. Nothing is written if any chunk fails.
+        """
+        results = []
+        pending = None
+        if self._near_duplicates is not None:
+            self._near_duplicates.ensure_loaded(self._load_near_duplicates)
+            # Near duplicates among the items themselves, keyed by fingerprint
+            pending = NearDuplicateIndex(self._near_duplicates.threshold)
+            pending.ensure_loaded(lambda: ())
+        try:
+            with self.transaction() as conn:
+                self._track_changes(conn)
+                category_ids = dict(conn.execute("SELECT name, id FROM categories"))
+                iterator = iter(quotes)
+                while True:
+                    chunk = list(islice(iterator, chunk_size))
+                    if not chunk:
+                        break
+                    results.append(
+                        self._insert_chunk(conn, chunk, category_ids, pending)
+                    )
+        except sqlite3.Error as e:
+            logger.error(f"Error bulk adding quotes: {e}")
+            return []
+
+        logger.info(
+            f"Bulk added {sum(r['inserted'] for r in results)} quotes "
+            f"in {len(results)} batches."
+        )
+        return results
+
+    def _insert_chunk(
+        self,
+        conn: sqlite3.Connection,
+        chunk: List[Dict],
+        category_ids: Dict[str, int],
+        pending: Optional[NearDuplicateIndex] = None,
+    ) -> Dict[str, int]:
+        # Keep the first occurrence of each fingerprint, then drop stored ones
+        new_quotes: Dict[int, Dict] = {}
+        for item in chunk:
+            new_quotes.setdefault(fingerprint(item["quote"]), item)
+        placeholders = ",".join("?" * len(new_quotes))
+        for (value,) in conn.execute(
+            f"SELECT fingerprint FROM quotes WHERE fingerprint IN ({placeholders})",
+            list(new_quotes),
+        ):
+            del new_quotes[value]
+
+        signatures = {}
+        if pending is not None:
+            for value, item in list(new_quotes.items()):
+                text = item["quote"]
+                signature = pending.signature(text)
+                if (
+                    self._near_duplicates.find(text, signature) is None
+                    and pending.find(text, signature) is None
+                ):
+                    pending.add(value, text, signature)
+                    signatures[value] = signature
+                else:
+                    del new_quotes[value]
+
+        missing = {item["category"] for item in new_quotes.values()}
+        missing.difference_update(category_ids)
+        if missing:
+            conn.executemany(
+                "INSERT OR IGNORE INTO categories (name) VALUES (?)",
+                [(name,) for name in missing],
+            )
+            self._after_commit(self._categories_changed)
+            placeholders = ",".join("?" * len(missing))
+            category_ids.update(
+                conn.execute(
+                    f"SELECT name, id FROM categories WHERE name IN ({placeholders})",
+                    list(missing),
+                )
+            )
+
+        touched_names = {item["category"] for item in new_quotes.values()}
+        self._after_commit(lambda: self._quotes_changed(*touched_names))
+        conn.executemany(
+            """
+            INSERT INTO quotes (quote, author, category_id, fingerprint)
+            VALUES (?, ?, ?, ?)""",
+            [
+                (item["quote"], item["author"], category_ids[item["category"]], value)
+                for value, item in new_quotes.items()
+            ],
+        )
+        inserted = []
+        if new_quotes:
+            placeholders = ",".join("?" * len(new_quotes))
+            inserted = conn.execute(
+                f"SELECT id, fingerprint FROM quotes WHERE fingerprint IN ({placeholders})",
+                list(new_quotes),
+            ).fetchall()
+
+        def index_inserted():
+            for quote_id, value in inserted:
+                self._quote_index.add(new_quotes[value]["category"], quote_id)
+                if value in signatures:
+                    self._near_duplicates.add(
+                        quote_id, new_quotes[value]["quote"], signatures[value]
+                    )
+
+        self._after_commit(index_inserted)
+
+        # Trim every category now over the cap back to it in one statement
+        touched = [category_ids[name] for name in touched_names]
+        placeholders = ",".join("?" * len(touched))
+        over_cap = [
+            category_id
+            for (category_id,) in conn.execute(
+                f"""
+                SELECT category_id FROM quotes
+                WHERE category_id IN ({placeholders})
+                GROUP BY category_id
+                HAVING COUNT(*) > ?""",
+                (*touched, self.QUOTES_PER_CATEGORY),
+            )
+        ]
+        evicted = []
+        if over_cap:
+            placeholders = ",".join("?" * len(over_cap))
+            evicted = conn.execute(
+                f"""
+                DELETE FROM quotes
+                WHERE id IN (
+                    SELECT id FROM (
+                        SELECT id, ROW_NUMBER() OVER (
+                            PARTITION BY category_id
+                            ORDER BY timestamp DESC, id DESC
+                        ) AS position
+                        FROM quotes
+                        WHERE category_id IN ({placeholders})
+                    )
+                    WHERE position > ?
+                )
+                RETURNING id, category_id""",
+                (*over_cap, self.QUOTES_PER_CATEGORY),
+            ).fetchall()
+            names = {category_id: name for name, category_id in category_ids.items()}
+
+            def unindex_evicted():
+                for quote_id, category_id in evicted:
+                    self._quote_index.remove(names[category_id], quote_id)
+                    if self._near_duplicates is not None:
+                        self._near_duplicates.remove(quote_id)
+
+            self._after_commit(unindex_evicted)
+
+        return {
+            "inserted": len(new_quotes),
+            "duplicates": len(chunk) - len(new_quotes),
+            "evicted": len(evicted),
+        }
+
     def get_all_quotes(self) -> List[Dict]:
         sql = """
         SELECT q.quote, q.author, c.name as category, q.timestamp
@@ -134,8 +639,9 @@ class Database:
         JOIN categories c ON q.category_id = c.id
         ORDER BY c.name, q.timestamp DESC
         """
-        try:
-            with self.connect() as conn:
+
+        def load():
+            with self.transaction() as conn:
                 c = conn.cursor()
                 c.execute(sql)
                 return [
@@ -147,43 +653,115 @@ class Database:
                     }
                     for row in c.fetchall()
                 ]
+
+        try:
+            self._check_outside_changes()
+            return list(self._cache.get(ALL_QUOTES_KEY, load))
         except sqlite3.Error as e:
             logger.error(f"Error getting quotes: {e}")
             return []
 
-    def get_random_quote(self, category: Optional[str] = None) -> Optional[Dict]:
-        if category:
-            sql = """
-            SELECT q.quote, q.author, c.name as category
-            FROM quotes q
-            JOIN categories c ON q.category_id = c.id
-            WHERE c.name = ?
-            ORDER BY RANDOM()
-            LIMIT 1
-            """
-            params = (category,)
-        else:
-            sql = """
-            SELECT q.quote, q.author, c.name as category
-            FROM quotes q
-            JOIN categories c ON q.category_id = c.id
-            ORDER BY RANDOM()
-            LIMIT 1
-            """
-            params = ()
+    def _load_near_duplicates(self) -> List[Tuple[int, str]]:
+        with self.transaction() as conn:
+            return conn.execute("SELECT id, quote FROM quotes").fetchall()
+
+    def _load_quote_index(self) -> List[Tuple[str, int]]:
+        sql = """
+        SELECT c.name, q.id
+        FROM quotes q
+        JOIN categories c ON q.category_id = c.id
+        """
+        with self.transaction() as conn:
+            return conn.execute(sql).fetchall()
+
+    def get_random_quote(
+        self,
+        category: Optional[str] = None,
+        weights: Optional[Dict[str, float]] = None,
+    ) -> Optional[Dict]:
+        """Pick a random quote with a single primary-key lookup.
 
+        Ids come from the in-memory `QuoteIndex`; `weights` optionally maps
+        category names to relative selection weights.
+        """
+        sql = """
+        SELECT q.quote, q.author, c.name as category
+        FROM quotes q
+        JOIN categories c ON q.category_id = c.id
+        WHERE q.id = ?
+        """
         try:
-            with self.connect() as conn:
-                c = conn.cursor()
-                c.execute(sql, params)
-                row = c.fetchone()
+            self._check_outside_changes()
+            for _ in range(RANDOM_PICK_ATTEMPTS):
+                self._quote_index.ensure_loaded(self._load_quote_index)
+                quote_id = self._quote_index.choose(category or None, weights)
+                if quote_id is None:
+                    return None
+                with self.transaction() as conn:
+                    row = conn.execute(sql, (quote_id,)).fetchone()
                 if row:
                     return {"quote": row[0], "author": row[1], "category": row[2]}
-                return None
+                # Deleted by another process since the last change check
+                self._quote_index.discard(quote_id)
+            return None
         except sqlite3.Error as e:
             logger.error(f"Error getting random quote: {e}")
             return None
 
+    def quote_count(self, category: Optional[str] = None) -> int:
+        """Quotes in a category (or in all), from the in-memory index."""
+        try:
+            self._check_outside_changes()
+            self._quote_index.ensure_loaded(self._load_quote_index)
+        except sqlite3.Error as e:
+            logger.error(f"Error loading quote index: {e}")
+            return 0
+        return self._quote_index.count(category)
+
+    def quote_set(self, category: str) -> Tuple[int, int]:
+        """(count, checksum) of a category's quote ids, from the in-memory index.
+
+        The checksum changes whenever the set of ids does, so together they
+        tell whether positions from `get_quote_at` still mean the same quotes.
+        """
+        try:
+            self._check_outside_changes()
+            self._quote_index.ensure_loaded(self._load_quote_index)
+        except sqlite3.Error as e:
+            logger.error(f"Error loading quote index: {e}")
+            return 0, 0
+        return (
+            self._quote_index.count(category),
+            self._quote_index.checksum(category),
+        )
+
+    def get_quote_at(self, category: str, position: int) -> Optional[Dict]:
+        """The quote at `position` (0 to `quote_count(category)` - 1) in a category.
+
+        Positions are only stable while the category is unchanged.
+        """
+        sql = """
+        SELECT q.quote, q.author, c.name as category
+        FROM quotes q
+        JOIN categories c ON q.category_id = c.id
+        WHERE q.id = ?
+        """
+        try:
+            self._check_outside_changes()
+            self._quote_index.ensure_loaded(self._load_quote_index)
+            quote_id = self._quote_index.get(category, position)
+            if quote_id is None:
+                return None
+            with self.transaction() as conn:
+                row = conn.execute(sql, (quote_id,)).fetchone()
+            if row:
+                return {"quote": row[0], "author": row[1], "category": row[2]}
+            self._quote_index.remove(category, quote_id)
+            return None
+        except sqlite3.Error as e:
+            logger.error(f"Error getting quote at position: {e}")
+            return None
+
     def get_quotes_by_category(self, category: str) -> List[Dict]:
         sql = """
         SELECT q.quote, q.author, q.timestamp
@@ -192,18 +770,137 @@ class Database:
         WHERE c.name = ?
         ORDER BY q.timestamp DESC
         """
-        try:
-            with self.connect() as conn:
+
+        def load():
+            with self.transaction() as conn:
                 c = conn.cursor()
                 c.execute(sql, (category,))
                 return [
                     {"quote": row[0], "author": row[1], "timestamp": row[2]}
                     for row in c.fetchall()
                 ]
+
+        try:
+            self._check_outside_changes()
+            return list(self._cache.get(("quotes_by_category", category), load))
         except sqlite3.Error as e:
             logger.error(f"Error getting quotes by category: {e}")
             return []
 
+    def _stream(
+        self, sql: str, params: tuple, chunk_size: int
+    ) -> Iterator[QuoteRow]:
+        # Not a `connection` block: that would pin the connection to this
+        # thread between yields, while the caller does other work
+        conn = self.connect()
+        owned = conn is not getattr(self._local, "conn", None)
+        try:
+            c = conn.cursor()
+            c.execute(sql, params)
+            while True:
+                rows = c.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield from map(QuoteRow._make, rows)
+        except sqlite3.Error as e:
+            logger.error(f"Error streaming quotes: {e}")
+        finally:
+            if owned:
+                conn.close()
+
+    def iter_all_quotes(
+        self, chunk_size: int = STREAM_CHUNK_SIZE
+    ) -> Iterator[QuoteRow]:
+        """Stream every quote in `get_all_quotes` order, `chunk_size` rows at a time."""
+        sql = """
+        SELECT q.id, q.quote, q.author, c.name, q.timestamp
+        FROM quotes q
+        JOIN categories c ON q.category_id = c.id
+        ORDER BY c.name, q.timestamp DESC, q.id DESC
+        """
+        return self._stream(sql, (), chunk_size)
+
+    def iter_quotes_by_category(
+        self, category: str, chunk_size: int = STREAM_CHUNK_SIZE
+    ) -> Iterator[QuoteRow]:
+        """Stream a category's quotes, newest first, `chunk_size` rows at a time."""
+        sql = """
+        SELECT q.id, q.quote, q.author, c.name, q.timestamp
+        FROM quotes q
+        JOIN categories c ON q.category_id = c.id
+        WHERE c.name = ?
+        ORDER BY q.timestamp DESC, q.id DESC
+        """
+        return self._stream(sql, (category,), chunk_size)
+
+    def get_quotes_page(
+        self,
+        category: str,
+        limit: int = PAGE_SIZE,
+        cursor: Optional[PageCursor] = None,
+    ) -> Tuple[List[QuoteRow], Optional[PageCursor]]:
+        """Return one page of a category's quotes, newest first.
+
+        Pass the returned cursor back to get the following page; it is None
+        on the last page. Each page is a single index range scan, however deep.
+        """
+        sql = """
+        SELECT q.id, q.quote, q.author, c.name, q.timestamp
+        FROM quotes q
+        JOIN categories c ON q.category_id = c.id
+        WHERE c.name = ? AND (q.timestamp, q.id) < (?, ?)
+        ORDER BY q.timestamp DESC, q.id DESC
+        LIMIT ?
+        """
+        # No real row sorts after this, so it starts from the newest quote
+        timestamp, quote_id = cursor or ("\uffff", 0)
+        try:
+            with self.transaction() as conn:
+                rows = conn.execute(
+                    sql, (category, timestamp, quote_id, limit + 1)
+                ).fetchall()
+        except sqlite3.Error as e:
+            logger.error(f"Error getting quotes page: {e}")
+            return [], None
+
+        page = [QuoteRow._make(row) for row in rows[:limit]]
+        if len(rows) > limit:
+            return page, (page[-1].timestamp, page[-1].id)
+        return page, None
+
+    def search_quotes(
+        self, query: str, category: Optional[str] = None, limit: int = SEARCH_LIMIT
+    ) -> List[QuoteRow]:
+        """Full-text search over quote text and author, best matches first.
+
+        Every word in `query` must match, each as a prefix ("lov" finds
+        "love"). FTS5 operators in `query` are treated as plain words.
+        """
+        terms = re.findall(r"\w+", query)
+        if not terms:
+            return []
+        match = " ".join(f'"{term}"*' for term in terms)
+
+        sql = """
+        SELECT q.id, q.quote, q.author, c.name, q.timestamp
+        FROM quotes_fts
+        JOIN quotes q ON q.id = quotes_fts.rowid
+        JOIN categories c ON q.category_id = c.id
+        WHERE quotes_fts MATCH ?
+        """
+        params: list = [match]
+        if category:
+            sql += " AND c.name = ?"
+            params.append(category)
+        sql += " ORDER BY quotes_fts.rank LIMIT ?"
+        params.append(limit)
+        try:
+            with self.transaction() as conn:
+                return [QuoteRow._make(row) for row in conn.execute(sql, params)]
+        except sqlite3.Error as e:
+            logger.error(f"Error searching quotes: {e}")
+            return []
+
     def initialize_default_data(self, categories: Optional[List[str]] = None):
         """Initialize the database with default categories."""
         if categories is None:
@@ -220,3 +917,96 @@ class Database:
 
         for category in categories:
             self.add_category(category)
+
+    def get_user_preferences(self) -> List[Tuple[int, str, str, str, int, int]]:
+        """All rows of user_preferences, in PREFERENCE_COLUMNS order."""
+        sql = f"SELECT {', '.join(PREFERENCE_COLUMNS)} FROM user_preferences"
+        try:
+            with self.transaction() as conn:
+                return conn.execute(sql).fetchall()
+        except sqlite3.Error as e:
+            logger.error(f"Error getting user preferences: {e}")
+            return []
+
+    def save_user_preferences(self, rows: Iterable[tuple]) -> bool:
+        """Upsert preference rows (in PREFERENCE_COLUMNS order) in one transaction."""
+        updates = ", ".join(
+            f"{column} = excluded.{column}" for column in PREFERENCE_COLUMNS[1:]
+        )
+        sql = f"""
+        INSERT INTO user_preferences ({', '.join(PREFERENCE_COLUMNS)})
+        VALUES ({', '.join('?' * len(PREFERENCE_COLUMNS))})
+        ON CONFLICT (chat_id) DO UPDATE SET {updates}
+        """
+        try:
+            with self.transaction() as conn:
+                conn.executemany(sql, rows)
+                return True
+        except sqlite3.Error as e:
+            logger.error(f"Error saving user preferences: {e}")
+            return False
+
+    def get_quote_rotation(
+        self, chat_id: int, category: str
+    ) -> Optional[Tuple[int, int, int, int]]:
+        """A chat's (seed, position, size, checksum) rotation state in a category."""
+        sql = """
+        SELECT seed, position, size, checksum FROM quote_rotations
+        WHERE chat_id = ? AND category = ?
+        """
+        try:
+            with self.transaction() as conn:
+                return conn.execute(sql, (chat_id, category)).fetchone()
+        except sqlite3.Error as e:
+            logger.error(f"Error getting quote rotation: {e}")
+            return None
+
+    def save_quote_rotations(self, rows: Iterable[tuple]) -> bool:
+        """Upsert (chat_id, category, seed, position, size, checksum) rows at once."""
+        sql = """
+        INSERT INTO quote_rotations (chat_id, category, seed, position, size, checksum)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT (chat_id, category) DO UPDATE SET
+            seed = excluded.seed,
+            position = excluded.position,
+            size = excluded.size,
+            checksum = excluded.checksum
+        """
+        try:
+            with self.transaction() as conn:
+                conn.executemany(sql, rows)
+                return True
+        except sqlite3.Error as e:
+            logger.error(f"Error saving quote rotations: {e}")
+            return False
+
+    def get_delivery_slots(self, shard: int = 0) -> Dict[int, int]:
+        """Last claimed slot (in epoch minutes) per delivery minute of a shard."""
+        sql = "SELECT delivery_minute, last_slot FROM delivery_slots WHERE shard = ?"
+        try:
+            with self.transaction() as conn:
+                return dict(conn.execute(sql, (shard,)))
+        except sqlite3.Error as e:
+            logger.error(f"Error getting delivery slots: {e}")
+            return {}
+
+    def claim_delivery_slot(
+        self, delivery_minute: int, slot: int, shard: int = 0
+    ) -> Optional[bool]:
+        """Atomically mark `slot` as delivered for a shard's minute bucket.
+
+        Returns False if that slot, or a later one, was already claimed, so
+        a slot is only ever handed to the sender once, and None if the claim
+        could not be recorded, in which case the caller should retry.
+        """
+        sql = """
+        INSERT INTO delivery_slots (shard, delivery_minute, last_slot) VALUES (?, ?, ?)
+        ON CONFLICT (shard, delivery_minute) DO UPDATE SET last_slot = excluded.last_slot
+        WHERE last_slot < excluded.last_slot
+        """
+        try:
+            with self.transaction() as conn:
+                return conn.execute(sql, (shard, delivery_minute, slot)).rowcount > 0
+        except sqlite3.Error as e:
+            logger.error(f"Error claiming delivery slot: {e}")
+            return None
@@ -0,0 +1,145 @@
+import hashlib
+import random
+import re
+import threading
+import unicodedata
+from array import array
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+NUM_PERMUTATIONS = 64
+_MERSENNE_61 = (1 << 61) - 1
+_WORDS = re.compile(r"\w+")
+
+
+def normalize(text: str) -> str:
+    """Fold case, Unicode forms, punctuation and spacing so variants compare equal."""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    return " ".join(_WORDS.findall(text))
+
+
+def _hash64(text: str) -> int:
+    return int.from_bytes(
+        hashlib.blake2b(text.encode(), digest_size=8).digest(), "big", signed=True
+    )
+
+
+def fingerprint(text: str) -> int:
+    """Signed 64-bit hash of the normalized text, so it fits an SQLite INTEGER."""
+    return _hash64(normalize(text))
+
+
+def _shingles(text: str) -> Set[int]:
+    words = normalize(text).split()
+    if len(words) < 2:
+        return {_hash64(word) for word in words}
+    return {_hash64(f"{a} {b}") for a, b in zip(words, words[1:])}
+
+
+def _lsh_shape(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """(bands, rows) for the LSH.
+
+    Picks the S-curve crossing over closest below `threshold`: candidates
+    are confirmed against full signatures, so recall matters more than
+    precision here.
+    """
+    shapes = [
+        (num_perm // rows, rows)
+        for rows in range(1, num_perm + 1)
+        if num_perm % rows == 0
+    ]
+    below = [
+        shape for shape in shapes if (1 / shape[0]) ** (1 / shape[1]) <= threshold
+    ]
+    return max(below or shapes[:1], key=lambda shape: shape[1])
+
+
+class NearDuplicateIndex:
+    """MinHash signatures of stored quotes, banded for LSH lookups.
+
+    `find` returns the id of a stored quote whose word-bigram Jaccard
+    similarity to the text is estimated at `threshold` or more. Lookups
+    touch only the quotes sharing an LSH bucket, and each candidate is
+    confirmed against its full signature. Memory is about 0.6 KB per quote.
+    Like `QuoteIndex`, it loads lazily and is then kept in step with writes.
+    """
+
+    def __init__(self, threshold: float = 0.7, num_perm: int = NUM_PERMUTATIONS):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands, self.rows = _lsh_shape(num_perm, threshold)
+        rng = random.Random(num_perm)
+        self._perms = [
+            (rng.randrange(1, _MERSENNE_61), rng.randrange(_MERSENNE_61))
+            for _ in range(num_perm)
+        ]
+        self._signatures: Dict[int, array] = {}
+        self._buckets: Dict[int, Set[int]] = {}
+        self._loaded = False
+        self._lock = threading.RLock()
+
+    def signature(self, text: str) -> array:
+        shingles = _shingles(text) or {0}
+        return array(
+            "q",
+            (min((a * x + b) % _MERSENNE_61 for x in shingles) for a, b in self._perms),
+        )
+
+    def _band_keys(self, signature: array) -> List[int]:
+        rows = self.rows
+        return [
+            hash((band, tuple(signature[band * rows:(band + 1) * rows])))
+            for band in range(self.bands)
+        ]
+
+    def ensure_loaded(self, loader: Callable[[], Iterable[Tuple[int, str]]]):
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            self._signatures = {}
+            self._buckets = {}
+            for quote_id, text in loader():
+                self._add(quote_id, self.signature(text))
+            self._loaded = True
+
+    def invalidate(self):
+        with self._lock:
+            self._signatures = {}
+            self._buckets = {}
+            self._loaded = False
+
+    def find(self, text: str, signature: Optional[array] = None) -> Optional[int]:
+        signature = signature or self.signature(text)
+        with self._lock:
+            candidates = set()
+            for key in self._band_keys(signature):
+                candidates |= self._buckets.get(key, set())
+            for quote_id in candidates:
+                stored = self._signatures[quote_id]
+                same = sum(1 for x, y in zip(signature, stored) if x == y)
+                if same >= self.threshold * self.num_perm:
+                    return quote_id
+        return None
+
+    def add(self, quote_id: int, text: str, signature: Optional[array] = None):
+        with self._lock:
+            if self._loaded:
+                self._add(quote_id, signature or self.signature(text))
+
+    def _add(self, quote_id: int, signature: array):
+        self._signatures[quote_id] = signature
+        for key in self._band_keys(signature):
+            self._buckets.setdefault(key, set()).add(quote_id)
+
+    def remove(self, quote_id: int):
+        with self._lock:
+            signature = self._signatures.pop(quote_id, None)
+            if signature is None:
+                return
+            for key in self._band_keys(signature):
+                members = self._buckets.get(key)
+                if members is not None:
+                    members.discard(quote_id)
+                    if not members:
+                        del self._buckets[key]
@@ -0,0 +1,36 @@
+import asyncio
+import logging
+from typing import Optional
+
+from .database import Database
+
+logger = logging.getLogger(__name__)
+
+MAINTENANCE_INTERVAL = 6 * 60 * 60  # Seconds between maintenance runs
+
+
+class MaintenanceTask:
+    """Periodically runs `Database.run_maintenance` off the event loop."""
+
+    def __init__(self, db: Database, interval: float = MAINTENANCE_INTERVAL):
+        self.db = db
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="db-maintenance")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await asyncio.to_thread(self.db.run_maintenance)
+            except Exception as e:
+                logger.error(f"Maintenance run failed: {e}")
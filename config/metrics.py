@@ -0,0 +1,280 @@
+import asyncio
+import functools
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+# Read here rather than from config.settings, which imports config.database,
+# so .env is loaded first: this module may be imported before settings.
+# Instrumentation is applied when modules are imported, so with this off the
+# wrapped functions are the originals and cost nothing.
+load_dotenv()
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "").lower() in ("1", "true", "yes")
+
+# Seconds; spans a cached read (microseconds) to a slow API call
+LATENCY_BUCKETS = (
+    0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _format_labels(labels: Labels, extra: str = "") -> str:
+    parts = [f'{name}="{value}"' for name, value in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def values(self) -> Dict[Labels, float]:
+        with self._lock:
+            return dict(self._values)
+
+    def expose(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        for labels, value in sorted(self.values().items()):
+            yield f"{self.name}{_format_labels(labels)} {value}"
+
+
+class Histogram:
+    """Fixed-bucket histogram; one bucket-count list per label set."""
+
+    def __init__(
+        self, name: str, help: str, buckets: Tuple[float, ...] = LATENCY_BUCKETS
+    ):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        # labels -> [per-bucket counts (last is +Inf), sum]
+        self._series: Dict[Labels, List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str):
+        self.observe_labels(tuple(sorted(labels.items())), value)
+
+    def observe_labels(self, labels: Labels, value: float):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def snapshot(self) -> Dict[Labels, Tuple[List[int], float]]:
+        with self._lock:
+            return {
+                labels: (list(counts), total)
+                for labels, (counts, total) in self._series.items()
+            }
+
+    def quantile(self, q: float, counts: List[int]) -> float:
+        """Upper bound of the bucket holding the q-th observation."""
+        target = q * sum(counts)
+        seen = 0
+        for bound, count in zip(self.buckets, counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return float("inf")
+
+    def expose(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        for labels, (counts, total) in sorted(self.snapshot().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = _format_labels(labels, f'le="{bound}"')
+                yield f"{self.name}_bucket{le} {cumulative}"
+            cumulative += counts[-1]
+            inf = _format_labels(labels, 'le="+Inf"')
+            yield f"{self.name}_bucket{inf} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(labels)} {total}"
+            yield f"{self.name}_count{_format_labels(labels)} {cumulative}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, help: str):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help)
+            return metric
+
+    def counter(self, name: str, help: str) -> Counter:
+        return self._get_or_create(Counter, name, help)
+
+    def histogram(self, name: str, help: str) -> Histogram:
+        return self._get_or_create(Histogram, name, help)
+
+    def metrics(self) -> List[object]:
+        with self._lock:
+            return [self._metrics[name] for name in sorted(self._metrics)]
+
+    def expose(self) -> str:
+        lines = []
+        for metric in self.metrics():
+            lines.extend(metric.expose())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def timed(name: str, help: str, **labels: str) -> Callable:
+    """Decorator recording a function's latency, and its errors, under `labels`.
+
+    Works on plain and async functions. Returns the function untouched when
+    metrics are disabled.
+    """
+
+    def decorate(func: Callable) -> Callable:
+        if not METRICS_ENABLED:
+            return func
+        histogram = REGISTRY.histogram(name, help)
+        errors = REGISTRY.counter(
+            name.replace("_seconds", "") + "_errors_total", f"Errors raised ({help})"
+        )
+        key = tuple(sorted(labels.items()))
+
+        if asyncio.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                except Exception:
+                    errors.inc(**labels)
+                    raise
+                finally:
+                    histogram.observe_labels(key, time.perf_counter() - started)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                errors.inc(**labels)
+                raise
+            finally:
+                histogram.observe_labels(key, time.perf_counter() - started)
+
+        return wrapper
+
+    return decorate
+
+
+def instrument_methods(
+    name: str, help: str, exclude: Tuple[str, ...] = ()
+) -> Callable:
+    """Class decorator applying `timed` to every public method.
+
+    Each method is labelled `method=<name>`. Generators and context managers
+    return before doing their work, so list them in `exclude`.
+    """
+
+    def decorate(cls):
+        if not METRICS_ENABLED:
+            return cls
+        for attr, value in list(vars(cls).items()):
+            if attr.startswith("_") or attr in exclude or not callable(value):
+                continue
+            setattr(cls, attr, timed(name, help, method=attr)(value))
+        return cls
+
+    return decorate
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = REGISTRY.expose().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Scrapes every few seconds would flood the log
+
+
+class MetricsServer:
+    """Serves the registry in Prometheus text format at /metrics."""
+
+    def __init__(self, port: int, host: str = "127.0.0.1"):
+        self.host = host
+        self.port = port
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._server = ThreadingHTTPServer((self.host, self.port), _MetricsHandler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="metrics-server", daemon=True
+        )
+        self._thread.start()
+        logger.info(f"Serving metrics on http://{self.host}:{self.port}/metrics")
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
+
+
+def summary() -> List[str]:
+    """One line per histogram series: count, mean and bucketed p50/p95/p99."""
+    lines = []
+    for metric in REGISTRY.metrics():
+        if isinstance(metric, Histogram):
+            for labels, (counts, total) in sorted(metric.snapshot().items()):
+                count = sum(counts)
+                if not count:
+                    continue
+                label = ",".join(value for _, value in labels) or metric.name
+                p50, p95, p99 = (metric.quantile(q, counts) for q in (0.5, 0.95, 0.99))
+                lines.append(
+                    f"{label}: {count} calls, mean {total / count * 1000:.2f}ms, "
+                    f"p50≤{p50 * 1000:g}ms p95≤{p95 * 1000:g}ms p99≤{p99 * 1000:g}ms"
+                )
+        elif isinstance(metric, Counter):
+            for labels, value in sorted(metric.values().items()):
+                label = ",".join(value for _, value in labels)
+                lines.append(f"{metric.name}{{{label}}}: {value:g}")
+    return lines
@@ -0,0 +1,300 @@
+import logging
+import sqlite3
+from typing import Callable, List, Tuple, Union
+
+from .dedup import fingerprint
+
+logger = logging.getLogger(__name__)
+
+Step = Union[str, Callable[[sqlite3.Connection], None]]
+
+# Keep quotes_fts (external content) in step with quotes
+FTS_TRIGGERS = (
+    """
+    CREATE TRIGGER IF NOT EXISTS quotes_fts_insert AFTER INSERT ON quotes
+    BEGIN
+        INSERT INTO quotes_fts (rowid, quote, author)
+        VALUES (new.id, new.quote, new.author);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS quotes_fts_delete AFTER DELETE ON quotes
+    BEGIN
+        INSERT INTO quotes_fts (quotes_fts, rowid, quote, author)
+        VALUES ('delete', old.id, old.quote, old.author);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS quotes_fts_update AFTER UPDATE ON quotes
+    BEGIN
+        INSERT INTO quotes_fts (quotes_fts, rowid, quote, author)
+        VALUES ('delete', old.id, old.quote, old.author);
+        INSERT INTO quotes_fts (rowid, quote, author)
+        VALUES (new.id, new.quote, new.author);
+    END
+    """,
+)
+
+
+# Count every change to quotes and categories, whoever makes it, so a
+# process can tell when its in-memory copies are out of date
+CHANGE_TRIGGERS = tuple(
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {table}_changes_{event.lower()}
+    AFTER {event} ON {table}
+    BEGIN
+        UPDATE quote_changes SET version = version + 1;
+    END
+    """
+    for table in ("quotes", "categories")
+    for event in ("INSERT", "UPDATE", "DELETE")
+)
+
+
+def _rebuild_quotes_with_fingerprints(conn: sqlite3.Connection):
+    # SQLite cannot drop a UNIQUE constraint in place, so copy the table.
+    # Rows whose normalized text collides keep only the oldest copy.
+    conn.execute(
+        """
+        CREATE TABLE quotes_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            quote TEXT NOT NULL,
+            author TEXT NOT NULL,
+            category_id INTEGER,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            fingerprint INTEGER NOT NULL,
+            FOREIGN KEY (category_id) REFERENCES categories (id)
+        )
+        """
+    )
+    seen = set()
+
+    def rows():
+        for row in conn.execute(
+            "SELECT id, quote, author, category_id, timestamp FROM quotes ORDER BY id"
+        ):
+            value = fingerprint(row[1])
+            if value not in seen:
+                seen.add(value)
+                yield (*row, value)
+
+    conn.executemany(
+        """
+        INSERT INTO quotes_new (id, quote, author, category_id, timestamp, fingerprint)
+        VALUES (?, ?, ?, ?, ?, ?)""",
+        rows(),
+    )
+    sequence = conn.execute(
+        "SELECT seq FROM sqlite_sequence WHERE name = 'quotes'"
+    ).fetchone()
+    conn.execute("DROP TABLE quotes")
+    conn.execute("ALTER TABLE quotes_new RENAME TO quotes")
+    if sequence:
+        # Never hand out the id of a since-deleted quote again
+        conn.execute(
+            "UPDATE sqlite_sequence SET seq = max(seq, ?) WHERE name = 'quotes'",
+            sequence,
+        )
+
+
+# Append-only: (version, description, steps). A step is a SQL statement or a
+# callable taking the connection. The schema version lives in PRAGMA
+# user_version, so never renumber or edit a migration once it has shipped.
+MIGRATIONS: List[Tuple[int, str, Tuple[Step, ...]]] = [
+    (
+        1,
+        "Index quotes by category and age",
+        (
+            """
+            CREATE INDEX IF NOT EXISTS idx_quotes_category_timestamp
+            ON quotes (category_id, timestamp, id)
+            """,
+        ),
+    ),
+    (
+        2,
+        "Add daily quote subscriptions and delivery slot tracking",
+        (
+            """
+            CREATE TABLE IF NOT EXISTS subscriptions (
+                chat_id INTEGER PRIMARY KEY,
+                notification_time TEXT NOT NULL,
+                timezone TEXT NOT NULL,
+                delivery_minute INTEGER NOT NULL
+            )
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS idx_subscriptions_delivery_minute
+            ON subscriptions (delivery_minute)
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS delivery_slots (
+                delivery_minute INTEGER PRIMARY KEY,
+                last_slot INTEGER NOT NULL
+            )
+            """,
+        ),
+    ),
+    (
+        3,
+        "Move subscriptions into user_preferences",
+        (
+            """
+            CREATE TABLE IF NOT EXISTS user_preferences (
+                chat_id INTEGER PRIMARY KEY,
+                category TEXT NOT NULL,
+                notification_time TEXT NOT NULL,
+                timezone TEXT NOT NULL,
+                delivery_minute INTEGER NOT NULL,
+                subscribed INTEGER NOT NULL DEFAULT 0
+            )
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS idx_user_preferences_delivery_minute
+            ON user_preferences (delivery_minute) WHERE subscribed = 1
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS idx_user_preferences_category
+            ON user_preferences (category)
+            """,
+            """
+            INSERT OR IGNORE INTO user_preferences (
+                chat_id, category, notification_time, timezone,
+                delivery_minute, subscribed
+            )
+            SELECT chat_id, 'inspirational', notification_time, timezone,
+                   delivery_minute, 1
+            FROM subscriptions
+            """,
+            "DROP TABLE IF EXISTS subscriptions",
+        ),
+    ),
+    (
+        4,
+        "Add a full-text search index over quotes",
+        (
+            # External content: the index stores tokens only, text stays in quotes
+            """
+            CREATE VIRTUAL TABLE IF NOT EXISTS quotes_fts USING fts5(
+                quote, author, content='quotes', content_rowid='id'
+            )
+            """,
+            *FTS_TRIGGERS,
+            "INSERT INTO quotes_fts (quotes_fts) VALUES ('rebuild')",
+        ),
+    ),
+    (
+        5,
+        "Deduplicate quotes by normalized fingerprint instead of exact text",
+        (
+            _rebuild_quotes_with_fingerprints,
+            """
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_quotes_fingerprint
+            ON quotes (fingerprint)
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS idx_quotes_category_timestamp
+            ON quotes (category_id, timestamp, id)
+            """,
+            *FTS_TRIGGERS,
+            "INSERT INTO quotes_fts (quotes_fts) VALUES ('rebuild')",
+        ),
+    ),
+    (
+        6,
+        "Add per-chat quote rotation state",
+        (
+            """
+            CREATE TABLE IF NOT EXISTS quote_rotations (
+                chat_id INTEGER NOT NULL,
+                category TEXT NOT NULL,
+                seed INTEGER NOT NULL,
+                position INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                PRIMARY KEY (chat_id, category)
+            ) WITHOUT ROWID
+            """,
+        ),
+    ),
+    (
+        7,
+        "Track delivery slots per worker shard",
+        (
+            """
+            CREATE TABLE delivery_slots_new (
+                shard INTEGER NOT NULL,
+                delivery_minute INTEGER NOT NULL,
+                last_slot INTEGER NOT NULL,
+                PRIMARY KEY (shard, delivery_minute)
+            ) WITHOUT ROWID
+            """,
+            """
+            INSERT INTO delivery_slots_new (shard, delivery_minute, last_slot)
+            SELECT 0, delivery_minute, last_slot FROM delivery_slots
+            """,
+            "DROP TABLE delivery_slots",
+            "ALTER TABLE delivery_slots_new RENAME TO delivery_slots",
+        ),
+    ),
+    (
+        8,
+        "Key quote rotations to the category's set of quote ids",
+        (
+            # Existing rotations start a fresh shuffle on their next quote
+            """
+            ALTER TABLE quote_rotations
+            ADD COLUMN checksum INTEGER NOT NULL DEFAULT 0
+            """,
+        ),
+    ),
+    (
+        9,
+        "Count changes to quotes and categories across processes",
+        (
+            """
+            CREATE TABLE IF NOT EXISTS quote_changes (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                version INTEGER NOT NULL
+            )
+            """,
+            "INSERT OR IGNORE INTO quote_changes (id, version) VALUES (1, 0)",
+            *CHANGE_TRIGGERS,
+        ),
+    ),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """Apply every pending migration, each in its own transaction.
+
+    The write lock is taken before the version is re-read, so processes
+    starting at the same time cannot apply a step twice. Returns the schema
+    version the database ends up at.
+    """
+    version = get_schema_version(conn)
+    for target, description, steps in MIGRATIONS:
+        if target <= version:
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            version = get_schema_version(conn)
+            if target > version:
+                for step in steps:
+                    if callable(step):
+                        step(conn)
+                    else:
+                        conn.execute(step)
+                conn.execute(f"PRAGMA user_version = {target}")
+                version = target
+                logger.info(f"Applied migration {target}: {description}")
+            conn.commit()
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+    return version
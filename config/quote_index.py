@@ -0,0 +1,152 @@
+import bisect
+import random
+import threading
+from array import array
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+_MASK64 = (1 << 64) - 1
+
+
+def mix64(value: int) -> int:
+    """splitmix64 finaliser: a fixed, well-spread bijection on 64-bit ints.
+
+    Its output is stored (rotation seeds, id checksums), so it must not change.
+    """
+    value = (value ^ (value >> 30)) * 0xBF58476D1CE4E5B9 & _MASK64
+    value = (value ^ (value >> 27)) * 0x94D049BB133111EB & _MASK64
+    return value ^ (value >> 31)
+
+
+def _scramble(quote_id: int) -> int:
+    # Kept within SQLite's signed 64-bit integers
+    return mix64(quote_id & _MASK64) >> 1
+
+
+class QuoteIndex:
+    """Compact per-category arrays of quote ids for constant-time random picks.
+
+    The index is loaded lazily from the database on first use and then kept in
+    step with inserts and deletes, so choosing a quote never scans the table.
+    Each category's ids are kept sorted, so a position means the same quote
+    in every process and after every reload, for as long as the set of ids
+    is the same; a checksum of the ids changes whenever the set does, even
+    if its size stays the same.
+    """
+
+    def __init__(self):
+        self._ids: Dict[str, array] = {}
+        self._checksums: Dict[str, int] = {}
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def ensure_loaded(self, loader: Callable[[], Iterable[Tuple[str, int]]]):
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            ids: Dict[str, array] = {}
+            checksums: Dict[str, int] = {}
+            for category, quote_id in loader():
+                ids.setdefault(category, array("q")).append(quote_id)
+                checksums[category] = checksums.get(category, 0) ^ _scramble(
+                    quote_id
+                )
+            for category, category_ids in ids.items():
+                ids[category] = array("q", sorted(category_ids))
+            self._ids = ids
+            self._checksums = checksums
+            self._loaded = True
+
+    def invalidate(self):
+        """Drop the index so the next pick reloads it from the database."""
+        with self._lock:
+            self._ids = {}
+            self._checksums = {}
+            self._loaded = False
+
+    def add(self, category: str, quote_id: int):
+        with self._lock:
+            if self._loaded:
+                ids = self._ids.setdefault(category, array("q"))
+                pos = bisect.bisect_left(ids, quote_id)
+                if pos < len(ids) and ids[pos] == quote_id:
+                    return
+                # New ids are the largest, so this is almost always an append
+                ids.insert(pos, quote_id)
+                self._checksums[category] = self._checksums.get(
+                    category, 0
+                ) ^ _scramble(quote_id)
+
+    def remove(self, category: str, quote_id: int):
+        with self._lock:
+            ids = self._ids.get(category)
+            if not ids:
+                return
+            pos = bisect.bisect_left(ids, quote_id)
+            if pos == len(ids) or ids[pos] != quote_id:
+                return
+            del ids[pos]
+            self._checksums[category] ^= _scramble(quote_id)
+
+    def discard(self, quote_id: int):
+        """Remove an id whose category is not known, searching every category."""
+        with self._lock:
+            categories = [name for name, ids in self._ids.items() if quote_id in ids]
+        for category in categories:
+            self.remove(category, quote_id)
+
+    def get(self, category: str, position: int) -> Optional[int]:
+        """The id at `position` in a category's sorted ids."""
+        with self._lock:
+            ids = self._ids.get(category)
+            return ids[position] if ids and 0 <= position < len(ids) else None
+
+    def checksum(self, category: str) -> int:
+        """XOR of the scrambled ids in a category; 0 when it is empty."""
+        with self._lock:
+            return self._checksums.get(category, 0)
+
+    def count(self, category: Optional[str] = None) -> int:
+        with self._lock:
+            if category is not None:
+                return len(self._ids.get(category, ()))
+            return sum(len(ids) for ids in self._ids.values())
+
+    def choose(
+        self,
+        category: Optional[str] = None,
+        weights: Optional[Dict[str, float]] = None,
+    ) -> Optional[int]:
+        """Pick a quote id.
+
+        Without `category` or `weights` every quote is equally likely. With
+        `weights`, a category is drawn by weight first and then a quote
+        uniformly from it.
+        """
+        with self._lock:
+            if category is not None:
+                ids = self._ids.get(category)
+                return ids[random.randrange(len(ids))] if ids else None
+
+            if weights is not None:
+                candidates = [
+                    (name, weight)
+                    for name, weight in weights.items()
+                    if weight > 0 and self._ids.get(name)
+                ]
+                if not candidates:
+                    return None
+                names, category_weights = zip(*candidates)
+                ids = self._ids[random.choices(names, weights=category_weights)[0]]
+                return ids[random.randrange(len(ids))]
+
+            total = sum(len(ids) for ids in self._ids.values())
+            if not total:
+                return None
+            pick = random.randrange(total)
+            for ids in self._ids.values():
+                if pick < len(ids):
+                    return ids[pick]
+                pick -= len(ids)
+            return None
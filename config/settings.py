@@ -100,19 +100,30 @@
 
 
 import os
+from functools import lru_cache
+from typing import Dict, List, Optional
+
 from dotenv import load_dotenv
-from .database import Database  # Update the path as per your project structure
-from typing import List
-import sqlite3
-from logging import Logger
 
+# Before importing anything that reads the environment at import time
 load_dotenv()
 
+from .database import Database  # noqa: E402
+
 # Bot tokens
 TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
 DISCORD_TOKEN = os.getenv("DISCORD_TOKEN")
 DISCORD_CHANNEL_ID = os.getenv("DISCORD_CHANNEL_ID")
 
+# Webhook mode: set the public HTTPS URL Telegram should post updates to
+# (its path is served locally); unset means long polling
+TELEGRAM_WEBHOOK_URL = os.getenv("TELEGRAM_WEBHOOK_URL")
+WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "127.0.0.1")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8443"))
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")
+# Worker processes started by `main.py run`; more than one needs the webhook
+BOT_WORKERS = int(os.getenv("BOT_WORKERS", "1"))
+
 # API settings
 QUOTES_API_URL = "https://api.api-ninjas.com/v1/quotes"
 API_NINJA_KEY = os.getenv("API_NINJA_KEY")
@@ -122,32 +133,133 @@ API_TIMEOUT = 5
 DEFAULT_QUOTE_TIME = "06:00"
 TIMEZONE = "Asia/Dhaka"
 
+# Database settings
+DATABASE_FILE = os.getenv("DATABASE_FILE", "quotes.db")
+# Jaccard similarity (0-1) above which a new quote counts as a near
+# duplicate of a stored one; unset disables the check
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_THRESHOLD") or 0) or None
+# Read-only corpus snapshot written by `main.py export-snapshot`; only the
+# quote pool's fallback reads it
+SNAPSHOT_FILE = os.getenv("SNAPSHOT_FILE", "quotes.snapshot")
 
-# Initialize the database connection
-db = Database()
-
-# Fetch categories dynamically
-CATEGORIES = db.get_all_categories()
-
-# User preferences defaults
-DEFAULT_PREFERENCES = {
-    "category": "inspirational" if "inspirational" in CATEGORIES else CATEGORIES[0],
-    "notification_time": DEFAULT_QUOTE_TIME,
-    "timezone": TIMEZONE,
+# Metrics settings (METRICS_ENABLED itself is read in config.metrics)
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108"))
+ADMIN_USER_IDS = {
+    int(user_id) for user_id in os.getenv("ADMIN_USER_IDS", "").split(",") if user_id
 }
 
+# Categories seeded by main.py (API Ninja's category names)
+DEFAULT_CATEGORIES = [
+    "age",
+    "alone",
+    "amazing",
+    "anger",
+    "architecture",
+    "art",
+    "attitude",
+    "beauty",
+    "best",
+    "birthday",
+    "business",
+    "car",
+    "change",
+    "communication",
+    "computers",
+    "cool",
+    "courage",
+    "dad",
+    "dating",
+    "death",
+    "design",
+    "dreams",
+    "education",
+    "environmental",
+    "equality",
+    "experience",
+    "failure",
+    "faith",
+    "family",
+    "famous",
+    "fear",
+    "fitness",
+    "food",
+    "forgiveness",
+    "freedom",
+    "friendship",
+    "funny",
+    "future",
+    "god",
+    "good",
+    "government",
+    "graduation",
+    "great",
+    "happiness",
+    "health",
+    "history",
+    "home",
+    "hope",
+    "humor",
+    "imagination",
+    "inspirational",
+    "intelligence",
+    "jealousy",
+    "knowledge",
+    "leadership",
+    "learning",
+    "legal",
+    "life",
+    "love",
+    "marriage",
+    "medical",
+    "men",
+    "mom",
+    "money",
+    "morning",
+    "movies",
+    "success",
+]
+DEFAULT_CATEGORY = "inspirational"
+
 # Logging settings
 LOG_LEVEL = "INFO"
 
 
-def get_all_categories(self) -> List[str]:
-    """Fetch all category names from the database."""
-    sql = "SELECT name FROM categories ORDER BY name"
-    try:
-        with self.connect() as conn:
-            c = conn.cursor()
-            c.execute(sql)
-            return [row[0] for row in c.fetchall()]
-    except sqlite3.Error as e:
-        logger.error(f"Error fetching categories: {e}")
-        return []
+# Anything backed by the database is resolved on first access, so importing
+# this module never touches the disk. `db`, `CATEGORIES` and
+# `DEFAULT_PREFERENCES` remain available as module attributes via __getattr__.
+
+
+@lru_cache(maxsize=None)
+def get_database() -> Database:
+    return Database(DATABASE_FILE, near_duplicate_threshold=NEAR_DUPLICATE_THRESHOLD)
+
+
+def get_categories() -> List[str]:
+    # Not memoized here: the database's read cache already holds the list and
+    # drops it on any process's category change (see its change version)
+    return get_database().get_all_categories()
+
+
+def get_default_preferences(categories: Optional[List[str]] = None) -> Dict[str, str]:
+    """Preferences for chats without saved ones; pass `categories` if already read."""
+    if categories is None:
+        categories = get_categories()
+    return {
+        "category": (
+            DEFAULT_CATEGORY
+            if DEFAULT_CATEGORY in categories or not categories
+            else categories[0]
+        ),
+        "notification_time": DEFAULT_QUOTE_TIME,
+        "timezone": TIMEZONE,
+    }
+
+
+def __getattr__(name: str):
+    if name == "db":
+        return get_database()
+    if name == "CATEGORIES":
+        return get_categories()
+    if name == "DEFAULT_PREFERENCES":
+        return get_default_preferences()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,233 @@
+import bisect
+import mmap
+import os
+import random
+import struct
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from .database import CHANGE_VERSION_SQL, Database
+
+MAGIC = b"QSNAP\0\0\0"
+FORMAT_VERSION = 2
+CHECK_INTERVAL = 5  # Seconds between checks for a newly published snapshot
+
+# magic, format version, category count, quote count, created (ns), the
+# database's change version when exported, then the offsets of the
+# category table, quote table and string blob
+_HEADER = struct.Struct("<8sIIIQQQQQ")
+# name offset, name length, first quote, quote count
+_CATEGORY = struct.Struct("<QIII")
+# id, quote offset, author offset, quote length, author length
+_QUOTE = struct.Struct("<qQQII")
+
+
+def export_snapshot(db: Database, path: str) -> int:
+    """Compile the quotes and categories tables into a snapshot at `path`.
+
+    Quotes are grouped by category, so a category is a contiguous run of
+    fixed-size records pointing into one UTF-8 string blob. The file is
+    written beside `path` and renamed over it, so readers only ever see a
+    complete snapshot. It is stamped with the database's change version,
+    read in the same transaction as the quotes, so readers can tell when
+    the tables have moved on. Returns the number of quotes written.
+    """
+    sql = """
+    SELECT c.name, q.id, q.quote, q.author
+    FROM quotes q
+    JOIN categories c ON q.category_id = c.id
+    ORDER BY c.name, q.id
+    """
+    categories: List[Tuple[str, int, int]] = []
+    records: List[Tuple[int, int, int, int, int]] = []
+    blob = bytearray()
+
+    def intern(text: str) -> Tuple[int, int]:
+        data = text.encode()
+        offset = len(blob)
+        blob.extend(data)
+        return offset, len(data)
+
+    with db.transaction() as conn:
+        if not conn.in_transaction:
+            conn.execute("BEGIN")  # One read snapshot for the version and rows
+        change_version = conn.execute(CHANGE_VERSION_SQL).fetchone()[0]
+        for name, quote_id, quote, author in conn.execute(sql):
+            if not categories or categories[-1][0] != name:
+                categories.append((name, len(records), 0))
+            name, first, count = categories[-1]
+            categories[-1] = (name, first, count + 1)
+            quote_offset, quote_length = intern(quote)
+            author_offset, author_length = intern(author)
+            records.append(
+                (quote_id, quote_offset, author_offset, quote_length, author_length)
+            )
+
+    category_table = bytearray()
+    for name, first, count in categories:
+        name_offset, name_length = intern(name)
+        category_table += _CATEGORY.pack(name_offset, name_length, first, count)
+
+    categories_at = _HEADER.size
+    quotes_at = categories_at + len(category_table)
+    strings_at = quotes_at + _QUOTE.size * len(records)
+    header = _HEADER.pack(
+        MAGIC,
+        FORMAT_VERSION,
+        len(categories),
+        len(records),
+        time.time_ns(),
+        change_version,
+        categories_at,
+        quotes_at,
+        strings_at,
+    )
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".snapshot-", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(header)
+            f.write(category_table)
+            for record in records:
+                f.write(_QUOTE.pack(*record))
+            f.write(blob)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return len(records)
+
+
+class QuoteSnapshot:
+    """Read-only, memory-mapped view of an exported snapshot.
+
+    Nothing is copied at open beyond the small category table; pages are
+    shared with every other process mapping the same file. Raises
+    ValueError for a file that is not a snapshot of this format.
+    `change_version` is the database's change version at export; the
+    snapshot is current only while the database still reports it.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            (
+                magic,
+                version,
+                category_count,
+                self.quote_count,
+                self.created,
+                self.change_version,
+                categories_at,
+                self._quotes_at,
+                self._strings_at,
+            ) = _HEADER.unpack_from(self._map)
+        except struct.error:
+            self._map.close()
+            raise ValueError(f"{path} is not a quote snapshot")
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self._map.close()
+            raise ValueError(f"{path} is not a version {FORMAT_VERSION} quote snapshot")
+
+        self._categories: Dict[str, Tuple[int, int]] = {}
+        self._firsts: List[int] = []
+        for i in range(category_count):
+            name_offset, name_length, first, count = _CATEGORY.unpack_from(
+                self._map, categories_at + i * _CATEGORY.size
+            )
+            self._categories[self._string(name_offset, name_length)] = (first, count)
+            self._firsts.append(first)
+        self._names = list(self._categories)
+
+    def _string(self, offset: int, length: int) -> str:
+        start = self._strings_at + offset
+        return self._map[start:start + length].decode()
+
+    def categories(self) -> List[str]:
+        return list(self._names)
+
+    def count(self, category: Optional[str] = None) -> int:
+        if category is None:
+            return self.quote_count
+        return self._categories.get(category, (0, 0))[1]
+
+    def _quote(self, index: int, category: str) -> Dict:
+        _, quote_offset, author_offset, quote_length, author_length = (
+            _QUOTE.unpack_from(self._map, self._quotes_at + index * _QUOTE.size)
+        )
+        return {
+            "quote": self._string(quote_offset, quote_length),
+            "author": self._string(author_offset, author_length),
+            "category": category,
+        }
+
+    def get(self, category: str, position: int) -> Optional[Dict]:
+        first, count = self._categories.get(category, (0, 0))
+        if not 0 <= position < count:
+            return None
+        return self._quote(first + position, category)
+
+    def random_quote(self, category: Optional[str] = None) -> Optional[Dict]:
+        if category is not None:
+            return self.get(category, random.randrange(self.count(category) or 1))
+        if not self.quote_count:
+            return None
+        index = random.randrange(self.quote_count)
+        name = self._names[bisect.bisect_right(self._firsts, index) - 1]
+        return self._quote(index, name)
+
+    def close(self):
+        self._map.close()
+
+
+class SnapshotStore:
+    """Serves the latest snapshot published at `path`, swapping atomically.
+
+    Every `check_interval` seconds an access checks whether the file was
+    replaced and, if so, maps the new one; readers holding the old
+    snapshot keep using it until they let go. `current` is None until a
+    snapshot exists.
+    """
+
+    def __init__(self, path: str, check_interval: float = CHECK_INTERVAL):
+        self.path = path
+        self.check_interval = check_interval
+        self._snapshot: Optional[QuoteSnapshot] = None
+        self._identity: Optional[Tuple[int, int]] = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def current(self) -> Optional[QuoteSnapshot]:
+        now = time.monotonic()
+        if now - self._checked >= self.check_interval:
+            with self._lock:
+                if now - self._checked >= self.check_interval:
+                    self._refresh()
+                    self._checked = now
+        return self._snapshot
+
+    def _refresh(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        identity = (stat.st_ino, stat.st_mtime_ns)
+        if identity == self._identity:
+            return
+        try:
+            self._snapshot = QuoteSnapshot(self.path)
+        except (OSError, ValueError):
+            return
+        self._identity = identity
+
+    def random_quote(self, category: Optional[str] = None) -> Optional[Dict]:
+        snapshot = self.current
+        return snapshot.random_quote(category) if snapshot else None
@@ -0,0 +1,119 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Any, Dict, Optional, Tuple
+
+from .database import Database
+
+logger = logging.getLogger(__name__)
+
+
+class WriterService:
+    """Runs every process's database writes on one thread of this process.
+
+    Workers connect over a local socket (see `RemoteWriter`) and send
+    `(method name, args, kwargs)`; each call runs on the single writer
+    thread against this process's `Database`, so SQLite only ever sees
+    one writer however many workers there are. Readers stay in the
+    workers, which WAL allows alongside the writer.
+    """
+
+    def __init__(self, db: Database, address: str, authkey: bytes):
+        self.db = db
+        self.address = address
+        self.authkey = authkey
+        self._executor = ThreadPoolExecutor(1, thread_name_prefix="db-writer")
+        self._listener: Optional[Listener] = None
+        self._connections: Dict[int, Connection] = {}
+        self._lock = threading.Lock()
+
+    def start(self):
+        self._listener = Listener(self.address, "AF_UNIX", authkey=self.authkey)
+        threading.Thread(
+            target=self._accept, name="writer-accept", daemon=True
+        ).start()
+
+    def stop(self):
+        if self._listener is not None:
+            self._listener.close()
+            self._listener = None
+        with self._lock:
+            for conn in self._connections.values():
+                conn.close()
+            self._connections.clear()
+        self._executor.shutdown(wait=True)
+
+    def _accept(self):
+        while self._listener is not None:
+            try:
+                conn = self._listener.accept()
+            except OSError:
+                return  # Closed by stop
+            except Exception as e:
+                logger.warning(f"Rejected writer connection: {e}")
+                continue
+            with self._lock:
+                self._connections[id(conn)] = conn
+            threading.Thread(
+                target=self._serve, args=(conn,), name="writer-conn", daemon=True
+            ).start()
+
+    def _serve(self, conn: Connection):
+        try:
+            while True:
+                name, args, kwargs = conn.recv()
+                try:
+                    future = self._executor.submit(self._call, name, args, kwargs)
+                    result = ("ok", future.result())
+                except Exception as e:
+                    result = ("error", e)
+                conn.send(result)
+        except (EOFError, OSError):
+            pass
+        finally:
+            with self._lock:
+                self._connections.pop(id(conn), None)
+            conn.close()
+
+    def _call(self, name: str, args: Tuple, kwargs: Dict[str, Any]) -> Any:
+        if name.startswith("_"):
+            raise AttributeError(f"{name} is not a public Database method")
+        return getattr(self.db, name)(*args, **kwargs)
+
+
+class RemoteWriter:
+    """Client end of a `WriterService`; `call` blocks until the write is done.
+
+    `AsyncDatabase` already issues writes from a single thread, so one
+    connection per process is enough. Arguments and results must be
+    picklable; exceptions raised by the method are re-raised here.
+    """
+
+    def __init__(self, address: str, authkey: bytes):
+        self.address = address
+        self.authkey = authkey
+        self._conn: Optional[Connection] = None
+        self._lock = threading.Lock()
+
+    def call(self, name: str, args: Tuple = (), kwargs: Optional[Dict] = None) -> Any:
+        with self._lock:
+            if self._conn is None:
+                self._conn = Client(self.address, "AF_UNIX", authkey=self.authkey)
+            try:
+                self._conn.send((name, args, kwargs or {}))
+                status, result = self._conn.recv()
+            except (EOFError, OSError):
+                # Reconnect on the next call, e.g. after the supervisor restarts
+                self._conn.close()
+                self._conn = None
+                raise
+        if status == "error":
+            raise result
+        return result
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
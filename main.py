@@ -1,6 +1,19 @@
 # update_categories.py
-from config.settings import DEFAULT_CATEGORIES, DATABASE_FILE
-from quotes.manager import Database
+import argparse
+import asyncio
+
+from config.database import Database
+from config.settings import (
+    BOT_WORKERS,
+    DEFAULT_CATEGORIES,
+    DATABASE_FILE,
+    DISCORD_CHANNEL_ID,
+    DISCORD_TOKEN,
+    SNAPSHOT_FILE,
+    TELEGRAM_TOKEN,
+    TELEGRAM_WEBHOOK_URL,
+)
+from config.snapshot import export_snapshot
 
 
 def update_categories():
@@ -12,12 +25,66 @@ def update_categories():
         db.add_category(category)
 
     # Fetch updated categories from the database
-    categories = db.get_all_categories()
-    return [
-        category["name"] for category in categories
-    ]  # Adjust structure based on how you store them
+    return db.get_all_categories()
+
+
+def export_quote_snapshot():
+    # Publishes atomically; running bots' pool fallback switches to it within
+    # a few seconds
+    db = Database(db_file=DATABASE_FILE)
+    count = export_snapshot(db, SNAPSHOT_FILE)
+    db.close()
+    return count
+
+
+def run_bots(workers: int = BOT_WORKERS):
+    if workers > 1:
+        run_workers(workers)
+        return
+
+    # Both bots in one process, sharing the database and quote pool
+    from bots.runtime import run
+
+    if not TELEGRAM_TOKEN and not DISCORD_TOKEN:
+        print("Error: set TELEGRAM_TOKEN and/or DISCORD_TOKEN in .env")
+        return
+    channel_id = int(DISCORD_CHANNEL_ID) if DISCORD_CHANNEL_ID else None
+    asyncio.run(run(TELEGRAM_TOKEN, DISCORD_TOKEN, channel_id))
+
+
+def run_workers(workers: int):
+    # The Telegram bot sharded across worker processes by chat
+    from bots.supervisor import supervise
+
+    if not TELEGRAM_TOKEN or not TELEGRAM_WEBHOOK_URL:
+        print("Error: worker processes need TELEGRAM_TOKEN and TELEGRAM_WEBHOOK_URL")
+        return
+    if DISCORD_TOKEN:
+        print("Note: worker processes run Telegram only; start Discord separately")
+    asyncio.run(supervise(TELEGRAM_TOKEN, TELEGRAM_WEBHOOK_URL, workers))
 
 
 if __name__ == "__main__":
-    updated_categories = update_categories()
-    print(f"Updated categories: {updated_categories}")
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "command",
+        nargs="?",
+        default="update-categories",
+        choices=("update-categories", "run", "export-snapshot"),
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=BOT_WORKERS,
+        help="bot worker processes for `run` (default: BOT_WORKERS)",
+    )
+    args = parser.parse_args()
+
+    if args.command == "run":
+        run_bots(args.workers)
+    elif args.command == "export-snapshot":
+        count = export_quote_snapshot()
+        print(f"Exported {count} quotes to {SNAPSHOT_FILE}")
+    else:
+        updated_categories = update_categories()
+        print(f"Updated categories: {updated_categories}")
@@ -0,0 +1,106 @@
+import logging
+import threading
+import time
+
+from config.metrics import METRICS_ENABLED, REGISTRY
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+FAILURE_THRESHOLD = 3  # Consecutive failures that open the circuit
+SLOW_CALL_SECONDS = 2.0  # Successful calls slower than this count as failures
+BASE_BACKOFF = 30  # Seconds the circuit stays open after first tripping
+MAX_BACKOFF = 30 * 60
+
+TRANSITIONS = REGISTRY.counter(
+    "circuit_breaker_transitions_total", "Circuit breaker state changes"
+)
+
+
+class CircuitBreaker:
+    """Closed/open/half-open circuit breaker shared by every caller of a service.
+
+    Failures, and calls slower than `slow_call`, count against the service.
+    After `failure_threshold` in a row the circuit opens and `allow` returns
+    False at once for `backoff` seconds. Then a single trial call is let
+    through: success closes the circuit, failure reopens it with the backoff
+    doubled, up to `max_backoff`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = FAILURE_THRESHOLD,
+        slow_call: float = SLOW_CALL_SECONDS,
+        base_backoff: float = BASE_BACKOFF,
+        max_backoff: float = MAX_BACKOFF,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.slow_call = slow_call
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.state = CLOSED
+        self.failures = 0
+        self.backoff = base_backoff
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a call may go ahead now; never blocks."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                if time.monotonic() - self._opened_at < self.backoff:
+                    return False
+                self._set_state(HALF_OPEN)
+            if self._trial_running:
+                return False
+            self._trial_running = True
+            return True
+
+    def retry_in(self) -> float:
+        """Seconds until the circuit lets a trial call through (0 if closed)."""
+        with self._lock:
+            if self.state != OPEN:
+                return 0.0
+            return max(0.0, self._opened_at + self.backoff - time.monotonic())
+
+    def record_success(self, latency: float = 0.0):
+        if latency > self.slow_call:
+            self.record_failure(f"slow call ({latency:.1f}s)")
+            return
+        with self._lock:
+            self.failures = 0
+            self._trial_running = False
+            if self.state != CLOSED:
+                self.backoff = self.base_backoff
+                self._set_state(CLOSED)
+
+    def record_failure(self, reason: str = ""):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN:
+                self._trial_running = False
+                self.backoff = min(self.backoff * 2, self.max_backoff)
+                self._open(reason)
+            elif self.state == CLOSED and self.failures >= self.failure_threshold:
+                self._open(reason)
+
+    def _open(self, reason: str):
+        self._opened_at = time.monotonic()
+        self._set_state(OPEN)
+        logger.warning(
+            f"Circuit '{self.name}' opened for {self.backoff:.0f}s "
+            f"after {self.failures} failures: {reason}"
+        )
+
+    def _set_state(self, state: str):
+        self.state = state
+        if METRICS_ENABLED:
+            TRANSITIONS.inc(breaker=self.name, state=state)
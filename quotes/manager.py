@@ -0,0 +1,246 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Iterable, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config.metrics import METRICS_ENABLED, REGISTRY, timed
+from config.settings import API_TIMEOUT, DEFAULT_CATEGORY, QUOTES_API_URL
+from quotes.breaker import CircuitBreaker
+
+logger = logging.getLogger(__name__)
+
+API_REQUESTS = REGISTRY.counter(
+    "quote_api_requests_total", "API Ninja requests by outcome"
+)
+POOL_QUOTES = REGISTRY.counter(
+    "quote_pool_quotes_total", "Quotes served by the pool, by source"
+)
+
+# Expanded local quotes collection for better fallback
+LOCAL_QUOTES = [
+    {
+        "quote": "Be the change you wish to see in the world.",
+        "author": "Mahatma Gandhi",
+    },
+    {
+        "quote": "The only way to do great work is to love what you do.",
+        "author": "Steve Jobs",
+    },
+    {
+        "quote": "Life is what happens when you're busy making other plans.",
+        "author": "John Lennon",
+    },
+    {
+        "quote": "Success is not final, failure is not fatal.",
+        "author": "Winston Churchill",
+    },
+    {
+        "quote": "The future belongs to those who believe in the beauty of their dreams.",
+        "author": "Eleanor Roosevelt",
+    },
+    {
+        "quote": "Imagination is more important than knowledge.",
+        "author": "Albert Einstein",
+    },
+    {
+        "quote": "The best way to predict the future is to create it.",
+        "author": "Peter Drucker",
+    },
+    {"quote": "Everything you can imagine is real.", "author": "Pablo Picasso"},
+]
+
+_session: Optional[requests.Session] = None
+
+# Shared by every QuoteManager so an outage is remembered process-wide
+API_BREAKER = CircuitBreaker("api_ninja")
+
+
+def get_session() -> requests.Session:
+    """Return the process-wide HTTP session so API calls reuse pooled connections."""
+    global _session
+    if _session is None:
+        session = requests.Session()
+        session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+        _session = session
+    return _session
+
+
+class QuoteManager:
+    def __init__(
+        self, breaker: CircuitBreaker = API_BREAKER, api_url: str = QUOTES_API_URL
+    ):
+        self.quotes = list(LOCAL_QUOTES)
+        self.breaker = breaker
+        self.api_url = api_url
+
+    def get_random_quote(self):
+        return random.choice(self.quotes)
+
+    def fetch_quotes(self, category: str = DEFAULT_CATEGORY) -> List[Dict]:
+        """Fetch quotes from API Ninja. Returns an empty list on any failure.
+
+        Returns immediately, without a request, while the circuit is open.
+        """
+        api_key = os.getenv("API_NINJA_KEY")
+        if not api_key:
+            logger.error("API_NINJA_KEY not found in .env file")
+            return []
+
+        if not self.breaker.allow():
+            if METRICS_ENABLED:
+                API_REQUESTS.inc(outcome="circuit_open")
+            return []
+
+        started = time.monotonic()
+        try:
+            response = self._request(category, api_key)
+            if METRICS_ENABLED:
+                API_REQUESTS.inc(outcome=str(response.status_code))
+
+            if response.status_code == 200:
+                # API Ninja returns a list of quotes
+                quotes = [
+                    {
+                        "quote": quote_data["quote"],
+                        "author": quote_data.get("author", "Unknown"),
+                    }
+                    for quote_data in response.json()
+                ]
+                self.breaker.record_success(time.monotonic() - started)
+                return quotes
+            self.breaker.record_failure(f"HTTP {response.status_code}")
+        except requests.exceptions.RequestException as e:
+            if METRICS_ENABLED:
+                API_REQUESTS.inc(outcome=type(e).__name__)
+            logger.warning(f"API request failed: {e}")
+            self.breaker.record_failure(type(e).__name__)
+        except Exception as e:
+            if METRICS_ENABLED:
+                API_REQUESTS.inc(outcome="error")
+            logger.error(f"Unexpected error: {e}")
+            self.breaker.record_failure(type(e).__name__)
+        return []
+
+    @timed("quote_api_request_seconds", "API Ninja request latency", api="api_ninja")
+    def _request(self, category: str, api_key: str) -> requests.Response:
+        return get_session().get(
+            self.api_url,
+            params={"category": category},
+            headers={"X-Api-Key": api_key},
+            timeout=API_TIMEOUT,
+        )
+
+    def get_quote_from_api(self, category: str = DEFAULT_CATEGORY):
+        quotes = self.fetch_quotes(category)
+        if quotes:
+            logger.debug("Fetched quote from API Ninja")
+            return quotes[0]
+
+        logger.debug("Falling back to local quote")
+        return self.get_random_quote()
+
+
+class QuotePool:
+    """Per-category buffer of prefetched API quotes.
+
+    `get_quote` reads from memory; background tasks refill each buffer on a
+    worker thread whenever it drops below `low_water`. An empty buffer, e.g.
+    while the API circuit is open, is served from `fallback` (an async
+    `category -> quote or None` that must not block the loop) and then from
+    the manager's local quotes.
+    """
+
+    def __init__(
+        self,
+        manager: QuoteManager,
+        categories: Iterable[str] = (DEFAULT_CATEGORY,),
+        size: int = 20,
+        low_water: int = 5,
+        retry_delay: float = 30,
+        fallback: Optional[Callable[[str], Awaitable[Optional[Dict]]]] = None,
+    ):
+        self.manager = manager
+        self.fallback = fallback
+        self.size = size
+        self.low_water = low_water
+        self.retry_delay = retry_delay
+        self._buffers: Dict[str, Deque[Dict]] = {}
+        self._wakeups: Dict[str, asyncio.Event] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._running = False
+        for category in categories:
+            self._add_category(category)
+
+    def _add_category(self, category: str) -> Deque[Dict]:
+        buffer = self._buffers[category] = deque(maxlen=self.size)
+        self._wakeups[category] = asyncio.Event()
+        if self._running:
+            self._start_refill(category)
+        return buffer
+
+    def _start_refill(self, category: str):
+        self._tasks[category] = asyncio.create_task(
+            self._refill(category), name=f"quote-refill-{category}"
+        )
+
+    async def start(self):
+        self._running = True
+        for category in self._buffers:
+            self._start_refill(category)
+
+    async def stop(self):
+        self._running = False
+        tasks = list(self._tasks.values())
+        self._tasks.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def get_quote(self, category: str = DEFAULT_CATEGORY) -> Dict:
+        buffer = self._buffers.get(category)
+        if buffer is None:
+            buffer = self._add_category(category)
+
+        quote = None
+        if buffer:
+            quote = buffer.popleft()
+            source = "pool"
+        elif self.fallback is not None:
+            quote = await self.fallback(category)
+            source = "fallback"
+        if quote is None:
+            quote = self.manager.get_random_quote()
+            source = "local"
+        if METRICS_ENABLED:
+            POOL_QUOTES.inc(source=source)
+        if len(buffer) < self.low_water:
+            self._wakeups[category].set()
+        return quote
+
+    async def _refill(self, category: str):
+        buffer = self._buffers[category]
+        wakeup = self._wakeups[category]
+        while True:
+            wakeup.clear()
+            while len(buffer) < self.size:
+                try:
+                    quotes = await asyncio.to_thread(
+                        self.manager.fetch_quotes, category
+                    )
+                except Exception as e:
+                    logger.error(f"Error refilling '{category}' quotes: {e}")
+                    quotes = []
+                if not quotes:
+                    # Sleep out an open circuit rather than polling it
+                    await asyncio.sleep(
+                        self.manager.breaker.retry_in() or self.retry_delay
+                    )
+                    continue
+                buffer.extend(quotes)
+            await wakeup.wait()
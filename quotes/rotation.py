@@ -0,0 +1,166 @@
+import asyncio
+import logging
+import random
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from config.async_database import AsyncDatabase
+from config.quote_index import mix64
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL = 5  # Seconds between batched write-backs
+MAX_ROTATIONS = 100_000  # Kept in memory before the least recently used is dropped
+FEISTEL_ROUNDS = 4
+
+_MASK64 = (1 << 64) - 1
+_GOLDEN = 0x9E3779B97F4A7C15
+
+
+def permute(position: int, size: int, seed: int) -> int:
+    """Map `position` to its place in a seeded pseudo-random shuffle of range(size).
+
+    A small Feistel network is a bijection on the next even power of two;
+    outputs outside `size` are fed back in (cycle walking), which takes
+    fewer than four rounds on average.
+    """
+    half_bits = max(1, ((size - 1).bit_length() + 1) // 2)
+    mask = (1 << half_bits) - 1
+    value = position
+    while True:
+        left, right = value >> half_bits, value & mask
+        for round_ in range(FEISTEL_ROUNDS):
+            key = mix64((seed + round_ * _GOLDEN + right) & _MASK64)
+            left, right = right, left ^ (key & mask)
+        value = (left << half_bits) | right
+        if value < size:
+            return value
+
+
+class Rotation:
+    __slots__ = ("seed", "position", "size", "checksum")
+
+    def __init__(
+        self, seed: int, position: int = 0, size: int = 0, checksum: int = 0
+    ):
+        self.seed = seed
+        self.position = position
+        self.size = size
+        self.checksum = checksum
+
+
+class RotationStore:
+    """Per-chat, per-category no-repeat quote rotation.
+
+    Each rotation is a shuffle-bag stored as just (seed, position, size,
+    checksum): the next quote is position `permute(position, size, seed)`
+    of the category's sorted ids, so a chat sees every quote once before
+    any repeats, at O(1) cost and constant memory per chat and category.
+    Sorted positions mean the same quotes in every process and after every
+    reload. A new shuffle starts when the bag is exhausted or the
+    category's set of quotes changes, which the checksum of its ids shows
+    even at the same size.
+
+    Rotations are read on first use and kept in a bounded LRU. Changes are
+    written back in batches every `flush_interval` seconds and on `stop`.
+    """
+
+    def __init__(
+        self,
+        db: AsyncDatabase,
+        flush_interval: float = FLUSH_INTERVAL,
+        max_rotations: int = MAX_ROTATIONS,
+    ):
+        self.db = db
+        self.flush_interval = flush_interval
+        self.max_rotations = max_rotations
+        self._rotations: "OrderedDict[Tuple[int, str], Rotation]" = OrderedDict()
+        self._dirty: Dict[Tuple[int, str], tuple] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        # Build the quote index on a reader thread now, not in the first /quote
+        await self.db.quote_count()
+        self._task = asyncio.create_task(
+            self._flush_periodically(), name="rotation-flush"
+        )
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    async def next_quote(self, chat_id: int, category: str) -> Optional[Dict]:
+        """The chat's next unseen quote in `category`, or None if it has none.
+
+        Reads only the in-memory quote index and one row by primary key.
+        """
+        size, checksum = await self.db.quote_set(category)
+        if not size:
+            return None
+
+        key = (chat_id, category)
+        rotation = await self._get(key)
+        if (
+            rotation.size != size
+            or rotation.checksum != checksum
+            or rotation.position >= size
+        ):
+            rotation.seed = random.getrandbits(63)
+            rotation.position = 0
+            rotation.size = size
+            rotation.checksum = checksum
+        position = permute(rotation.position, size, rotation.seed)
+        rotation.position += 1
+        self._dirty[key] = (
+            chat_id,
+            category,
+            rotation.seed,
+            rotation.position,
+            rotation.size,
+            rotation.checksum,
+        )
+        return await self.db.get_quote_at(category, position)
+
+    async def _get(self, key: Tuple[int, str]) -> Rotation:
+        rotation = self._rotations.get(key)
+        if rotation is not None:
+            self._rotations.move_to_end(key)
+            return rotation
+
+        # Unsaved state of a rotation dropped from the LRU wins over the table
+        unsaved = self._dirty.get(key)
+        row = unsaved[2:] if unsaved else await self.db.get_quote_rotation(*key)
+        rotation = self._rotations.get(key)
+        if rotation is not None:
+            # Loaded by a concurrent call for the same chat while we waited
+            self._rotations.move_to_end(key)
+            return rotation
+        rotation = Rotation(*row) if row else Rotation(0)
+        self._rotations[key] = rotation
+        if len(self._rotations) > self.max_rotations:
+            # Dirty state is held in _dirty, so nothing unsaved is lost
+            self._rotations.popitem(last=False)
+        return rotation
+
+    async def flush(self):
+        if not self._dirty:
+            return
+        dirty, self._dirty = self._dirty, {}
+        saved = False
+        try:
+            saved = await self.db.save_quote_rotations(list(dirty.values()))
+        finally:
+            if not saved:
+                # Keep anything newer that arrived while saving
+                self._dirty = {**dirty, **self._dirty}
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing quote rotations: {e}")
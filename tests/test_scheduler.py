@@ -0,0 +1,130 @@
+import asyncio
+
+from bots import scheduler
+from bots.scheduler import MINUTES_PER_DAY, DailyScheduler
+
+DAY = MINUTES_PER_DAY * 60
+START = 20_000 * DAY + 12 * 3600  # Noon UTC
+
+
+class Clock:
+    def __init__(self, now: float):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.slots = {}
+
+    async def get_delivery_slots(self, shard=0):
+        return dict(self.slots)
+
+    async def claim_delivery_slot(self, delivery_minute, slot, shard=0):
+        if self.slots.get(delivery_minute, -1) >= slot:
+            return False
+        self.slots[delivery_minute] = slot
+        return True
+
+
+class FlakyDatabase(FakeDatabase):
+    """Fails the first `failures` claims, by raising or by returning None."""
+
+    def __init__(self, failures, error=None):
+        super().__init__()
+        self.failures = failures
+        self.error = error
+
+    async def claim_delivery_slot(self, delivery_minute, slot, shard=0):
+        if self.failures:
+            self.failures -= 1
+            if self.error is not None:
+                raise self.error
+            return None
+        return await super().claim_delivery_slot(delivery_minute, slot, shard)
+
+
+class FakePreferences:
+    def __init__(self, buckets):
+        self.buckets = buckets
+
+    def add_minute_listener(self, callback):
+        pass
+
+    def rebucket(self):
+        return 0
+
+    def delivery_minutes(self):
+        return list(self.buckets)
+
+    def chats_at(self, minute):
+        return self.buckets.get(minute, set())
+
+
+def run_days(monkeypatch, buckets, days, db=None):
+    """Run a scheduler on a fake clock for `days` days; return what it sent."""
+    clock = Clock(START)
+    end = START + days * DAY
+    sent = []
+    wait_for, sleep = asyncio.wait_for, asyncio.sleep
+
+    async def advance(delay):
+        # Advance the clock instead of waiting; deliveries run in between
+        await sleep(0)
+        clock.now += delay
+        if clock.now > end:
+            raise asyncio.CancelledError
+
+    async def sleep_through(awaitable, timeout):
+        awaitable.close()
+        await advance(timeout)
+        raise asyncio.TimeoutError
+
+    async def sender(chat_ids):
+        sent.append((clock.now, sorted(chat_ids)))
+
+    async def main():
+        monkeypatch.setattr(scheduler.time, "time", clock.time)
+        monkeypatch.setattr(scheduler.asyncio, "wait_for", sleep_through)
+        monkeypatch.setattr(scheduler.asyncio, "sleep", advance)
+        daily = DailyScheduler(db or FakeDatabase(), FakePreferences(buckets), sender)
+        await daily.start()
+        result = (await asyncio.gather(daily._task, return_exceptions=True))[0]
+        monkeypatch.setattr(scheduler.asyncio, "wait_for", wait_for)
+        monkeypatch.setattr(scheduler.asyncio, "sleep", sleep)
+        await daily.stop()
+        # Only the end of the simulation may stop the loop
+        assert isinstance(result, asyncio.CancelledError)
+
+    asyncio.run(main())
+    return sent
+
+
+def test_minute_zero_bucket_is_sent_across_midnight(monkeypatch):
+    sent = run_days(monkeypatch, {0: {1}, 7 * 60 + 30: {2}}, days=3)
+
+    midnights = [now for now, chats in sent if chats == [1]]
+    assert midnights == [START + 12 * 3600 + day * DAY for day in range(3)]
+    assert len([chats for _, chats in sent if chats == [2]]) == 3
+
+
+def test_each_slot_is_sent_once(monkeypatch):
+    sent = run_days(monkeypatch, {0: {1}, MINUTES_PER_DAY - 1: {2}}, days=2)
+
+    assert sorted(chats[0] for _, chats in sent) == [1, 1, 2, 2]
+
+
+def test_failed_claims_are_retried(monkeypatch):
+    db = FlakyDatabase(failures=3, error=asyncio.TimeoutError())
+    sent = run_days(monkeypatch, {0: {1}}, days=2, db=db)
+
+    assert [chats for _, chats in sent] == [[1], [1]]
+    assert sent[0][0] == START + 12 * 3600 + 3 * scheduler.RETRY_DELAY
+
+
+def test_unrecorded_claims_are_retried(monkeypatch):
+    sent = run_days(monkeypatch, {0: {1}}, days=2, db=FlakyDatabase(failures=2))
+
+    assert [chats for _, chats in sent] == [[1], [1]]
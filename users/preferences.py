@@ -0,0 +1,246 @@
+import asyncio
+import logging
+from datetime import date, datetime, time as day_time, timezone as dt_timezone
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+from zoneinfo import ZoneInfo
+
+from config.async_database import AsyncDatabase
+from config.settings import get_default_preferences
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL = 5  # Seconds between batched write-backs
+
+
+def parse_notification_time(notification_time: str) -> Tuple[int, int]:
+    """Parse "HH:MM", raising ValueError if it is not a valid time of day."""
+    hour, minute = (int(part) for part in notification_time.split(":"))
+    day_time(hour, minute)
+    return hour, minute
+
+
+def to_utc_minute(
+    notification_time: str, timezone: str, on: Optional[date] = None
+) -> int:
+    """Convert a local "HH:MM" in `timezone` to a UTC minute of day."""
+    hour, minute = parse_notification_time(notification_time)
+    local = datetime.combine(
+        on or datetime.now(dt_timezone.utc).date(),
+        day_time(hour, minute),
+        ZoneInfo(timezone),
+    )
+    utc = local.astimezone(dt_timezone.utc)
+    return utc.hour * 60 + utc.minute
+
+
+class UserPreferences:
+    __slots__ = (
+        "chat_id",
+        "category",
+        "notification_time",
+        "timezone",
+        "delivery_minute",
+        "subscribed",
+    )
+
+    def __init__(
+        self,
+        chat_id: int,
+        category: str,
+        notification_time: str,
+        timezone: str,
+        delivery_minute: int,
+        subscribed: bool = False,
+    ):
+        self.chat_id = chat_id
+        self.category = category
+        self.notification_time = notification_time
+        self.timezone = timezone
+        self.delivery_minute = delivery_minute
+        self.subscribed = bool(subscribed)
+
+    def as_row(self) -> tuple:
+        return (
+            self.chat_id,
+            self.category,
+            self.notification_time,
+            self.timezone,
+            self.delivery_minute,
+            int(self.subscribed),
+        )
+
+
+class PreferencesStore:
+    """In-memory mirror of the user_preferences table.
+
+    Records are kept by chat id, with secondary indexes of subscribed chats
+    by UTC delivery minute and of all chats by category. Lookups never touch
+    the database. Changes are written back in batches every
+    `flush_interval` seconds and on `stop`.
+
+    `owns` restricts the store to the chats one worker is responsible for;
+    other workers' rows are skipped on load.
+    """
+
+    def __init__(
+        self,
+        db: AsyncDatabase,
+        flush_interval: float = FLUSH_INTERVAL,
+        owns: Optional[Callable[[int], bool]] = None,
+    ):
+        self.db = db
+        self.flush_interval = flush_interval
+        self.owns = owns
+        self._records: Dict[int, UserPreferences] = {}
+        self._by_minute: Dict[int, Set[int]] = {}
+        self._by_category: Dict[str, Set[int]] = {}
+        self._dirty: Set[int] = set()
+        self._minute_listeners: List[Callable[[int], None]] = []
+        # Refreshed on load and every flush, so get() never reads categories
+        self._defaults = get_default_preferences([])
+        self._task: Optional[asyncio.Task] = None
+
+    async def _refresh_defaults(self):
+        self._defaults = get_default_preferences(await self.db.get_all_categories())
+
+    async def load(self):
+        await self._refresh_defaults()
+        self._records.clear()
+        self._by_minute.clear()
+        self._by_category.clear()
+        for row in await self.db.get_user_preferences():
+            if self.owns is None or self.owns(row[0]):
+                self._index(UserPreferences(*row))
+
+    async def start(self):
+        await self.load()
+        self._task = asyncio.create_task(
+            self._flush_periodically(), name="preferences-flush"
+        )
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    def add_minute_listener(self, callback: Callable[[int], None]):
+        """Call `callback(minute)` whenever a delivery minute gains its first chat."""
+        self._minute_listeners.append(callback)
+
+    def get(self, chat_id: int) -> UserPreferences:
+        """A chat's preferences, or unsaved defaults if it has none."""
+        record = self._records.get(chat_id)
+        if record is None:
+            defaults = self._defaults
+            record = UserPreferences(
+                chat_id,
+                defaults["category"],
+                defaults["notification_time"],
+                defaults["timezone"],
+                to_utc_minute(defaults["notification_time"], defaults["timezone"]),
+            )
+        return record
+
+    def update(self, chat_id: int, **changes) -> UserPreferences:
+        """Change some of a chat's preferences and queue them for write-back.
+
+        Raises ValueError or KeyError for an invalid time or timezone, in
+        which case nothing is changed.
+        """
+        current = self.get(chat_id)
+        record = UserPreferences(*current.as_row())
+        for name, value in changes.items():
+            setattr(record, name, value)
+        if "notification_time" in changes or "timezone" in changes:
+            record.delivery_minute = to_utc_minute(
+                record.notification_time, record.timezone
+            )
+        self._unindex(chat_id)
+        self._index(record)
+        self._dirty.add(chat_id)
+        return record
+
+    def chats_at(self, minute: int) -> Set[int]:
+        """Subscribed chats due at a UTC minute of day (do not mutate)."""
+        return self._by_minute.get(minute, set())
+
+    def chats_in_category(self, category: str) -> Set[int]:
+        return self._by_category.get(category, set())
+
+    def delivery_minutes(self) -> List[int]:
+        return list(self._by_minute)
+
+    def rebucket(self, on: Optional[date] = None) -> int:
+        """Recompute every delivery minute for `on` (today) to follow DST.
+
+        Returns how many chats moved.
+        """
+        moved = 0
+        for record in list(self._records.values()):
+            try:
+                minute = to_utc_minute(record.notification_time, record.timezone, on)
+            except (ValueError, KeyError) as e:
+                logger.error(f"Bad schedule for chat {record.chat_id}: {e}")
+                continue
+            if minute != record.delivery_minute:
+                self._unindex(record.chat_id)
+                record.delivery_minute = minute
+                self._index(record)
+                self._dirty.add(record.chat_id)
+                moved += 1
+        return moved
+
+    def __iter__(self) -> Iterator[UserPreferences]:
+        return iter(self._records.values())
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def _index(self, record: UserPreferences):
+        self._records[record.chat_id] = record
+        self._by_category.setdefault(record.category, set()).add(record.chat_id)
+        if record.subscribed:
+            bucket = self._by_minute.setdefault(record.delivery_minute, set())
+            bucket.add(record.chat_id)
+            if len(bucket) == 1:
+                for callback in self._minute_listeners:
+                    callback(record.delivery_minute)
+
+    def _unindex(self, chat_id: int):
+        record = self._records.pop(chat_id, None)
+        if record is None:
+            return
+        self._discard(self._by_category, record.category, chat_id)
+        if record.subscribed:
+            self._discard(self._by_minute, record.delivery_minute, chat_id)
+
+    @staticmethod
+    def _discard(index: dict, key, chat_id: int):
+        members = index.get(key)
+        if members is not None:
+            members.discard(chat_id)
+            if not members:
+                del index[key]
+
+    async def flush(self):
+        if not self._dirty:
+            return
+        dirty, self._dirty = self._dirty, set()
+        rows = [self._records[chat_id].as_row() for chat_id in dirty]
+        saved = False
+        try:
+            saved = await self.db.save_user_preferences(rows)
+        finally:
+            if not saved:
+                self._dirty |= dirty
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+                await self._refresh_defaults()
+            except Exception as e:
+                logger.error(f"Error flushing user preferences: {e}")